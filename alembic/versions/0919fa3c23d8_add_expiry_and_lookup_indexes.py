@@ -0,0 +1,40 @@
+"""Add expiry and lookup indexes
+
+Revision ID: 0919fa3c23d8
+Revises: b13b47449df4
+Create Date: 2026-10-18 10:03:17.882190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0919fa3c23d8'
+down_revision: Union[str, Sequence[str], None] = 'b13b47449df4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_otp_phone_is_used', 'otp', ['phone', 'is_used'], unique=False)
+    op.create_index('ix_otp_verification_id_is_used', 'otp', ['verification_id', 'is_used'], unique=False)
+    op.create_index(op.f('ix_otp_expires_at'), 'otp', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_pending_users_email'), 'pending_users', ['email'], unique=False)
+    op.create_index(op.f('ix_pending_users_expires_at'), 'pending_users', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_password_reset_token_user_id'), 'password_reset_token', ['user_id'], unique=False)
+    op.create_index(op.f('ix_password_reset_token_expires_at'), 'password_reset_token', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_password_reset_token_expires_at'), table_name='password_reset_token')
+    op.drop_index(op.f('ix_password_reset_token_user_id'), table_name='password_reset_token')
+    op.drop_index(op.f('ix_pending_users_expires_at'), table_name='pending_users')
+    op.drop_index(op.f('ix_pending_users_email'), table_name='pending_users')
+    op.drop_index(op.f('ix_otp_expires_at'), table_name='otp')
+    op.drop_index('ix_otp_verification_id_is_used', table_name='otp')
+    op.drop_index('ix_otp_phone_is_used', table_name='otp')
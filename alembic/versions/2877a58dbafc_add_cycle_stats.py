@@ -0,0 +1,101 @@
+"""Add cycle stats
+
+One summary row per user with cycles, backfilled by replaying each
+user's history through the estimator.
+
+Revision ID: 2877a58dbafc
+Revises: ce8864799cbb
+Create Date: 2026-10-18 11:45:15.556003
+
+"""
+from typing import Sequence, Union
+
+from datetime import datetime
+from itertools import groupby
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2877a58dbafc'
+down_revision: Union[str, Sequence[str], None] = 'ce8864799cbb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# utils.cycle_estimator as of this revision, frozen so replaying the
+# backfill always writes the same summaries
+EWMA_ALPHA = 0.3
+MIN_CYCLE_DAYS = 18
+MAX_CYCLE_DAYS = 45
+
+
+def _summarize(history) -> dict:
+    """cycle_stats values for (period_start, cycle_length, period_length)
+    rows, oldest first."""
+    summary = None
+    for period_start, cycle_length, period_length in history:
+        cycle_length = cycle_length or 28
+        period_length = period_length or 5
+        if summary is None:
+            summary = {"last_period_date": period_start, "cycles_observed": 0,
+                       "mean_length": float(cycle_length), "var_length": 0.0,
+                       "period_length": float(period_length), "reported_length": cycle_length}
+            continue
+        n = summary["cycles_observed"] + 1
+        alpha = max(EWMA_ALPHA, 1 / n)
+        gap = (period_start - summary["last_period_date"]).days
+        summary["period_length"] += alpha * (period_length - summary["period_length"])
+        summary["last_period_date"] = period_start
+        summary["reported_length"] = cycle_length
+        if MIN_CYCLE_DAYS <= gap <= MAX_CYCLE_DAYS:
+            diff = gap - summary["mean_length"]
+            step = alpha * diff
+            summary["cycles_observed"] = n
+            summary["mean_length"] += step
+            summary["var_length"] = (1 - alpha) * (summary["var_length"] + diff * step)
+    return summary
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    stats = op.create_table('cycle_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('last_period_date', sa.Date(), nullable=False),
+    sa.Column('cycles_observed', sa.Integer(), nullable=False),
+    sa.Column('mean_length', sa.Float(), nullable=False),
+    sa.Column('var_length', sa.Float(), nullable=False),
+    sa.Column('period_length', sa.Float(), nullable=False),
+    sa.Column('reported_length', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    cycles = sa.table(
+        'cycles',
+        sa.column('id', sa.Integer),
+        sa.column('user_id', sa.Integer),
+        sa.column('last_period_date', sa.Date),
+        sa.column('cycle_length', sa.Integer),
+        sa.column('period_length', sa.Integer),
+    )
+    rows = op.get_bind().execute(
+        sa.select(cycles.c.user_id, cycles.c.last_period_date,
+                  cycles.c.cycle_length, cycles.c.period_length)
+        .order_by(cycles.c.user_id, cycles.c.last_period_date, cycles.c.id)
+    )
+    now = datetime.utcnow()
+    summaries = []
+    for user_id, history in groupby(rows, key=lambda row: row[0]):
+        summary = _summarize(row[1:] for row in history)
+        summaries.append({"user_id": user_id, "updated_at": now, **summary})
+    if summaries:
+        op.bulk_insert(stats, summaries)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('cycle_stats')
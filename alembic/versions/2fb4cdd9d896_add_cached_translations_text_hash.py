@@ -0,0 +1,61 @@
+"""Add cached translations text hash
+
+Revision ID: 2fb4cdd9d896
+Revises: 6530310abb86
+Create Date: 2026-10-18 11:33:02.142153
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2fb4cdd9d896'
+down_revision: Union[str, Sequence[str], None] = '6530310abb86'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cached_translations', sa.Column('text_hash', sa.String(length=64), nullable=True))
+
+    bind = op.get_bind()
+    translations = sa.table(
+        'cached_translations',
+        sa.column('id', sa.Integer),
+        sa.column('original_text', sa.Text),
+        sa.column('text_hash', sa.String),
+        sa.column('language', sa.String),
+    )
+    seen = set()
+    duplicates = []
+    rows = bind.execute(
+        sa.select(translations.c.id, translations.c.original_text, translations.c.language)
+        .order_by(translations.c.id.desc())
+    ).all()
+    for row_id, original_text, language in rows:
+        digest = hashlib.sha256(original_text.encode()).hexdigest()
+        # Keep the newest translation of each (language, text)
+        if (language, digest) in seen:
+            duplicates.append(row_id)
+            continue
+        seen.add((language, digest))
+        bind.execute(
+            translations.update().where(translations.c.id == row_id).values(text_hash=digest))
+    if duplicates:
+        bind.execute(translations.delete().where(translations.c.id.in_(duplicates)))
+
+    with op.batch_alter_table('cached_translations') as batch_op:
+        batch_op.alter_column('text_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.create_index('ix_cached_translations_language_text_hash', ['language', 'text_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('cached_translations') as batch_op:
+        batch_op.drop_index('ix_cached_translations_language_text_hash')
+        batch_op.drop_column('text_hash')
@@ -0,0 +1,43 @@
+"""Add chat reply cache
+
+Revision ID: 6530310abb86
+Revises: 0919fa3c23d8
+Create Date: 2026-10-18 11:31:22.763761
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6530310abb86'
+down_revision: Union[str, Sequence[str], None] = '0919fa3c23d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('chat_reply_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cache_key', sa.String(length=64), nullable=False),
+    sa.Column('language', sa.String(length=10), nullable=False),
+    sa.Column('prompt', sa.Text(), nullable=False),
+    sa.Column('reply', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_chat_reply_cache_cache_key'), 'chat_reply_cache', ['cache_key'], unique=True)
+    op.create_index(op.f('ix_chat_reply_cache_expires_at'), 'chat_reply_cache', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_chat_reply_cache_id'), 'chat_reply_cache', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_chat_reply_cache_id'), table_name='chat_reply_cache')
+    op.drop_index(op.f('ix_chat_reply_cache_expires_at'), table_name='chat_reply_cache')
+    op.drop_index(op.f('ix_chat_reply_cache_cache_key'), table_name='chat_reply_cache')
+    op.drop_table('chat_reply_cache')
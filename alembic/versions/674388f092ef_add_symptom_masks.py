@@ -0,0 +1,100 @@
+"""Add symptom masks
+
+Adds symptom_mask to cycles and insights and fills it from the JSON
+symptoms lists, which are kept.
+
+Revision ID: 674388f092ef
+Revises: 2877a58dbafc
+Create Date: 2026-10-18 11:47:32.331296
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = '674388f092ef'
+down_revision: Union[str, Sequence[str], None] = '2877a58dbafc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ('cycles', 'insights')
+# utils.symptoms.SYMPTOM_IDS as of this revision, frozen so replaying the
+# backfill always writes the same masks
+SYMPTOM_BITS = {
+    'headache': 1 << 0,
+    'nausea': 1 << 1,
+    'cramps': 1 << 2,
+    'fatigue': 1 << 3,
+    'breast_tenderness': 1 << 4,
+    'acne': 1 << 5,
+    'egg_white_mucus': 1 << 6,
+    'ovulation_cramps': 1 << 7,
+    'high_libido': 1 << 8,
+    'soft_cervix': 1 << 9,
+    'bloating': 1 << 10,
+    'back_pain': 1 << 11,
+}
+BACKFILL_CHUNK = 1000
+
+
+def _encode(symptoms) -> int:
+    mask = 0
+    for name in symptoms or ():
+        mask |= SYMPTOM_BITS.get(name, 0)
+    return mask
+
+
+def _backfill(bind, name: str):
+    table = sa.table(
+        name,
+        sa.column('id', sa.Integer),
+        sa.column('symptoms', sa.JSON),
+        sa.column('symptom_mask', sa.BigInteger),
+    )
+    update = (
+        table.update()
+        .where(table.c.id == sa.bindparam('row_id'))
+        .values(symptom_mask=sa.bindparam('mask'))
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, table.c.symptoms)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(BACKFILL_CHUNK)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        masks = [{'row_id': row_id, 'mask': _encode(symptoms)}
+                 for row_id, symptoms in rows]
+        masks = [m for m in masks if m['mask']]
+        if masks:
+            bind.execute(update, masks)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name in TABLES:
+        op.add_column(name, sa.Column('symptom_mask', sa.BigInteger(), server_default='0', nullable=False))
+    bind = op.get_bind()
+    for name in TABLES:
+        _backfill(bind, name)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in TABLES:
+        with op.batch_alter_table(name) as batch_op:
+            batch_op.drop_column('symptom_mask')
+    if op.get_bind().dialect.name == 'sqlite':
+        # Recreating the table in batch mode reflects this index without DESC
+        op.drop_index('ix_cycles_user_id_last_period_date', table_name='cycles')
+        op.create_index('ix_cycles_user_id_last_period_date', 'cycles',
+                        ['user_id', sa.text('last_period_date DESC'), sa.text('id DESC')], unique=False)
@@ -0,0 +1,42 @@
+"""Add row versions
+
+version_id counters for optimistic locking and response ETags. Existing
+rows start at version 1.
+
+Revision ID: 69063cadae31
+Revises: 674388f092ef
+Create Date: 2026-10-18 11:51:37.409413
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '69063cadae31'
+down_revision: Union[str, Sequence[str], None] = '674388f092ef'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ('users', 'user_profiles', 'cycles', 'insights')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name in TABLES:
+        op.add_column(name, sa.Column('version_id', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in TABLES:
+        with op.batch_alter_table(name) as batch_op:
+            batch_op.drop_column('version_id')
+    if op.get_bind().dialect.name == 'sqlite':
+        # Recreating the table in batch mode reflects this index without DESC
+        op.drop_index('ix_cycles_user_id_last_period_date', table_name='cycles')
+        op.create_index('ix_cycles_user_id_last_period_date', 'cycles',
+                        ['user_id', sa.text('last_period_date DESC'), sa.text('id DESC')], unique=False)
@@ -0,0 +1,72 @@
+"""Allow cycle history per user
+
+Drops the one-cycle-per-user unique constraint on cycles.user_id and
+indexes (user_id, last_period_date DESC, id DESC). Existing rows are kept.
+
+Revision ID: ce8864799cbb
+Revises: 2fb4cdd9d896
+Create Date: 2026-10-18 11:39:17.843842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ce8864799cbb'
+down_revision: Union[str, Sequence[str], None] = '2fb4cdd9d896'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Names unnamed constraints when SQLite batch mode reflects the table
+NAMING_CONVENTION = {"uq": "uq_%(table_name)s_%(column_0_name)s"}
+
+
+def _user_id_unique_name(bind) -> str:
+    for constraint in sa.inspect(bind).get_unique_constraints('cycles'):
+        if constraint['column_names'] == ['user_id'] and constraint['name']:
+            return constraint['name']
+    return 'uq_cycles_user_id'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    name = _user_id_unique_name(op.get_bind())
+    with op.batch_alter_table('cycles', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(name, type_='unique')
+    op.create_index('ix_cycles_user_id_last_period_date', 'cycles',
+                    ['user_id', sa.text('last_period_date DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema.
+
+    Only the latest cycle of each user survives, as the unique constraint
+    allows one row per user.
+    """
+    bind = op.get_bind()
+    cycles = sa.table(
+        'cycles',
+        sa.column('id', sa.Integer),
+        sa.column('user_id', sa.Integer),
+        sa.column('last_period_date', sa.Date),
+    )
+    seen = set()
+    older = []
+    rows = bind.execute(
+        sa.select(cycles.c.id, cycles.c.user_id)
+        .order_by(cycles.c.user_id, cycles.c.last_period_date.desc(), cycles.c.id.desc())
+    ).all()
+    for row_id, user_id in rows:
+        if user_id in seen:
+            older.append(row_id)
+        seen.add(user_id)
+    if older:
+        bind.execute(cycles.delete().where(cycles.c.id.in_(older)))
+
+    op.drop_index('ix_cycles_user_id_last_period_date', table_name='cycles')
+    with op.batch_alter_table('cycles', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.create_unique_constraint('uq_cycles_user_id', ['user_id'])
@@ -0,0 +1,67 @@
+"""Per-request cost of get_current_user before and after the token cache.
+
+"before" replays the old path: os.getenv for the key material plus a
+full jwt.decode on every call. "after" goes through get_current_user and
+the verified-token cache, cold (first sight of each token) and warm.
+
+    python -m benchmarks.bench_auth --tokens 100 --rounds 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import timedelta
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from jose import jwt
+
+from services.auth_tokens import token_verifier
+from utils.utils import create_access_token, get_current_user
+
+
+def legacy_decode(token: str) -> dict:
+    return jwt.decode(token, os.getenv('SECRET_KEY'), algorithms=os.getenv('ALGORITHM'))
+
+
+def per_call_us(fn, tokens, rounds) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for token in tokens:
+            fn(token)
+    return (time.perf_counter() - started) / (rounds * len(tokens)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    tokens = [create_access_token(f"user{i}@example.com", i, "user", timedelta(hours=1))
+              for i in range(args.tokens)]
+    loop = asyncio.new_event_loop()
+
+    def current_user(token):
+        return loop.run_until_complete(get_current_user(token))
+
+    before = per_call_us(legacy_decode, tokens, args.rounds)
+    token_verifier.cache._entries.clear()
+    cold = per_call_us(current_user, tokens, 1)
+    warm = per_call_us(current_user, tokens, args.rounds)
+    loop.close()
+
+    print(json.dumps({
+        "tokens": args.tokens,
+        "rounds": args.rounds,
+        "before_us_per_request": round(before, 2),
+        "after_cold_us_per_request": round(cold, 2),
+        "after_warm_us_per_request": round(warm, 2),
+        "speedup_warm": round(before / warm, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Throughput of the batch prediction engine against the scalar function.
+
+Checks that every row of predict_batch matches simple_fertility_ai on a
+random sample, then times both at each size. The scalar loop is timed on
+at most --scalar-cap users and extrapolated beyond that.
+
+    python -m benchmarks.bench_batch_predictions --sizes 1000 100000 1000000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from utils.batch_predictions import SYMPTOM_BITS, encode_symptoms, predict_batch
+from utils.predictions import simple_fertility_ai
+
+
+def make_users(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    names = list(SYMPTOM_BITS)
+    start = date(2025, 1, 1)
+    users = []
+    for _ in range(n):
+        users.append((
+            start + timedelta(days=rng.randrange(365)),
+            rng.randint(21, 32),
+            rng.randint(2, 10),
+            rng.sample(names, rng.randint(0, 4)),
+        ))
+    return users
+
+
+def to_arrays(users):
+    return (
+        np.array([u[0] for u in users], dtype="datetime64[D]"),
+        np.array([u[1] for u in users], dtype=np.int64),
+        np.array([u[2] for u in users], dtype=np.int64),
+        np.array([encode_symptoms(u[3]) for u in users], dtype=np.int64),
+    )
+
+
+def check_parity(users) -> int:
+    result = predict_batch(*to_arrays(users))
+    for i, (last, cycle, period, symptoms) in enumerate(users):
+        expected = simple_fertility_ai(cycle_length=cycle, last_period_date=last,
+                                       period_length=period, symptoms=symptoms)
+        actual = {
+            "period_start": str(result.period_start[i]),
+            "period_end": str(result.period_end[i]),
+            "period_length": int(result.period_length[i]),
+            "next_period": str(result.next_period[i]),
+            "ovulation_day": str(result.ovulation_day[i]),
+            "fertile_window": [str(result.fertile_start[i]), str(result.fertile_end[i])],
+            "fertility_score": int(result.fertility_score[i]),
+        }
+        if actual != expected:
+            raise AssertionError(f"row {i} differs: {actual} != {expected}")
+    return len(users)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--scalar-cap", type=int, default=100000)
+    parser.add_argument("--parity-sample", type=int, default=10000)
+    args = parser.parse_args()
+
+    report = {"parity_rows_checked": check_parity(make_users(args.parity_sample, seed=1)),
+              "sizes": []}
+    for n in args.sizes:
+        users = make_users(n)
+        arrays = to_arrays(users)
+
+        started = time.perf_counter()
+        predict_batch(*arrays)
+        batch_seconds = time.perf_counter() - started
+
+        sample = users[:min(n, args.scalar_cap)]
+        started = time.perf_counter()
+        for last, cycle, period, symptoms in sample:
+            simple_fertility_ai(cycle_length=cycle, last_period_date=last,
+                                period_length=period, symptoms=symptoms)
+        scalar_seconds = (time.perf_counter() - started) * n / len(sample)
+
+        report["sizes"].append({
+            "users": n,
+            "batch_seconds": round(batch_seconds, 4),
+            "batch_users_per_sec": round(n / batch_seconds),
+            "scalar_seconds": round(scalar_seconds, 4),
+            "scalar_users_per_sec": round(n / scalar_seconds),
+            "scalar_extrapolated": len(sample) < n,
+            "speedup": round(scalar_seconds / batch_seconds, 1),
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Requests/sec of the sync (threadpool) vs async DB session path.
+
+Runs the app in-process over ASGI so only handler + DB time is measured.
+Each mode runs in its own interpreter because USE_ASYNC_DB is read at
+import time:
+
+    python -m benchmarks.bench_db_engine --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+
+def run_mode(requests: int, concurrency: int) -> dict:
+    import httpx
+    import main
+    from database import SessionLocal, dispose_engines
+    from models import UserProfile, Users
+    from utils.utils import create_access_token
+
+    db = SessionLocal()
+    user = Users(email="bench@example.com", username="bench", first_name="Bench",
+                 last_name="User", hashed_password="x", phone_number="000",
+                 is_verified=True)
+    db.add(user)
+    db.commit()
+    db.add(UserProfile(user_id=user.id, age=30, cycle_length=28, period_length=5))
+    db.commit()
+    token = create_access_token(user.email, user.id, user.role, timedelta(hours=1))
+    db.close()
+
+    paths = ["/user/get_user", "/user/profile"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def drive():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one(i):
+                async with semaphore:
+                    response = await client.get(paths[i % len(paths)], headers=headers)
+                    response.raise_for_status()
+
+            await asyncio.gather(*(one(i) for i in range(concurrency)))  # warm up
+            started = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(requests)))
+            elapsed = time.perf_counter() - started
+
+        await dispose_engines()
+        return elapsed
+
+    elapsed = asyncio.run(drive())
+    return {"requests": requests, "concurrency": concurrency,
+            "seconds": round(elapsed, 3), "rps": round(requests / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mode", choices=["sync", "async"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.requests, args.concurrency)))
+        return
+
+    results = {}
+    for mode in ("sync", "async"):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ,
+                       DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                       USE_ASYNC_DB="true" if mode == "async" else "false",
+                       SECRET_KEY=os.getenv("SECRET_KEY", "bench-secret"),
+                       ALGORITHM=os.getenv("ALGORITHM", "HS256"))
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_db_engine", "--mode", mode,
+                 "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Caller-side cost of one log line: print vs synchronous logging vs the queue pipeline.
+
+Every variant writes a line like the old send-otp print to the same
+line-buffered file. "print" and "sync_json" format and write on the
+calling thread. "queue_json" goes through utils.logging_config's
+handler, so the caller only resolves the message and enqueues it. The
+listener's drain time is reported separately. Filtered DEBUG lines
+(level off, or sampled out) are timed too.
+
+Each variant runs on `--threads` threads at once. `--write-latency-us`
+makes every line written to the sink block for that long, as stdout does
+when a container's log pipe is backed up.
+
+    python -m benchmarks.bench_logging --lines 5000 --threads 1 8 --write-latency-us 0 100
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from utils.logging_config import JsonFormatter, build_pipeline, request_id_var, skip_unused_record_fields
+
+
+PAYLOAD = {"email": "a***@example.com", "phone": "***1234", "language": "yo"}
+
+
+class SlowSink:
+    """A line-buffered stream whose line writes block (without holding the
+    GIL) for `latency` seconds, one writer at a time, like a pipe."""
+
+    def __init__(self, file, latency: float):
+        self.file = file
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._pending = []
+
+    def write(self, text: str):
+        with self._lock:
+            self._pending.append(text)
+            if "\n" in text:
+                if self.latency:
+                    time.sleep(self.latency)
+                self.file.write("".join(self._pending))
+                self._pending.clear()
+            return len(text)
+
+    def flush(self):
+        self.file.flush()
+
+
+def run_threads(threads: int, lines: int, emit) -> float:
+    """Microseconds per call, as seen by the callers."""
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(n):
+        request_id_var.set(f"bench-{n}")
+        barrier.wait()
+        for _ in range(lines):
+            emit()
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for w in workers:
+        w.join()
+    return round((time.perf_counter() - started) / (threads * lines) * 1e6, 2)
+
+
+def make_logger(name: str, handler: logging.Handler, level=logging.INFO) -> logging.Logger:
+    logger = logging.getLogger(f"bench.{name}")
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(level)
+    return logger
+
+
+def bench(threads: int, lines: int, sink) -> dict:
+    calls = threads * lines
+    results = {"threads": threads}
+
+    results["print_us"] = run_threads(threads, lines, lambda: print(
+        "Received send-otp request:", PAYLOAD, file=sink))
+
+    sync = logging.StreamHandler(sink)
+    sync.setFormatter(JsonFormatter())
+    logger = make_logger("sync", sync)
+    results["sync_json_us"] = run_threads(threads, lines, lambda: logger.info(
+        "send-otp request", extra=PAYLOAD))
+
+    handler, listener = build_pipeline(sink, queue_size=calls)
+    logger = make_logger("queue", handler, logging.DEBUG)
+    listener.start()
+    results["queue_json_us"] = run_threads(threads, lines, lambda: logger.info(
+        "send-otp request", extra=PAYLOAD))
+    started = time.perf_counter()
+    listener.stop()
+    results["queue_drain_after_us"] = round((time.perf_counter() - started) / calls * 1e6, 2)
+
+    logger.setLevel(logging.INFO)
+    results["debug_level_off_us"] = run_threads(threads, lines, lambda: logger.debug(
+        "send-otp request", extra=PAYLOAD))
+
+    handler, listener = build_pipeline(sink, debug_sample_rate=0.0, queue_size=calls)
+    logger = make_logger("sampled", handler, logging.DEBUG)
+    listener.start()
+    results["debug_sampled_out_us"] = run_threads(threads, lines, lambda: logger.debug(
+        "send-otp request", extra=PAYLOAD))
+    listener.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=5000, help="log calls per thread")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--write-latency-us", type=float, nargs="+", default=[0, 100])
+    args = parser.parse_args()
+
+    skip_unused_record_fields()
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "out.log"), "w", buffering=1) as out:
+            for latency in args.write_latency_us:
+                sink = SlowSink(out, latency / 1e6)
+                for threads in args.threads:
+                    runs.append({"write_latency_us": latency, **bench(threads, args.lines, sink)})
+    print(json.dumps({"lines_per_thread": args.lines, "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Cost of the predict -> insight -> response path of POST /insights/insights.
+
+Compares the old path, where the prediction came back as "%Y-%m-%d"
+strings that the router parsed again and the untyped dict went through
+jsonable_encoder, with the typed CyclePredictionResult that keeps native
+dates until the route's response model serializes them. The old
+implementation is reproduced below so the two can run side by side.
+
+    python -m benchmarks.bench_prediction_path --rounds 50000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from fastapi.routing import serialize_response
+
+from routers.insights import router
+from services.insights_engine import generate_insight_key
+from services.translator import translate_insight
+from schemas import PredictionInsightResponse
+from utils.predictions import SYMPTOM_SCORES, predict_cycle
+
+
+RESPONSE_FIELD = next(route.response_field for route in router.routes
+                      if route.path == "/insights/insights" and "POST" in route.methods)
+
+
+def legacy_fertility_ai(*, cycle_length, last_period_date, period_length, symptoms):
+    cycle_length = cycle_length or 28
+    period_length = period_length or 5
+    last_period = datetime.combine(last_period_date, datetime.min.time())
+    ovulation = last_period + timedelta(days=cycle_length - 14)
+    fertility_score = 80
+    for s in symptoms or ():
+        if s in SYMPTOM_SCORES:
+            fertility_score += SYMPTOM_SCORES[s]
+    return {
+        "period_start": last_period.strftime("%Y-%m-%d"),
+        "period_end": (last_period + timedelta(days=period_length - 1)).strftime("%Y-%m-%d"),
+        "period_length": period_length,
+        "next_period": (last_period + timedelta(days=cycle_length)).strftime("%Y-%m-%d"),
+        "ovulation_day": ovulation.strftime("%Y-%m-%d"),
+        "fertile_window": [
+            (ovulation - timedelta(days=2)).strftime("%Y-%m-%d"),
+            (ovulation + timedelta(days=2)).strftime("%Y-%m-%d")
+        ],
+        "fertility_score": max(0, min(100, fertility_score))
+    }
+
+
+def str_to_date(date_str: str) -> date:
+    return datetime.strptime(date_str, "%Y-%m-%d").date()
+
+
+async def legacy_path(today, last, cycle, period, symptoms):
+    result = legacy_fertility_ai(cycle_length=cycle, last_period_date=last,
+                                 period_length=period, symptoms=symptoms)
+    str_to_date(result["next_period"])
+    ovulation = str_to_date(result["ovulation_day"])
+    fertile_start = str_to_date(result["fertile_window"][0])
+    fertile_end = str_to_date(result["fertile_window"][1])
+    key = generate_insight_key(today=today, ovulation_day=ovulation,
+                               fertility_score=result["fertility_score"])
+    # No response_model: FastAPI falls back to jsonable_encoder
+    return await serialize_response(
+        response_content={"predictions": result, "insight": translate_insight(key, "en")})
+
+
+async def typed_path(today, last, cycle, period, symptoms):
+    prediction = predict_cycle(cycle_length=cycle, last_period_date=last,
+                               period_length=period, symptoms=symptoms)
+    key = generate_insight_key(today=today, ovulation_day=prediction.ovulation_day,
+                               fertility_score=prediction.fertility_score)
+    return await serialize_response(
+        field=RESPONSE_FIELD,
+        response_content=PredictionInsightResponse(
+            predictions=prediction.to_schema(), insight=translate_insight(key, "en")))
+
+
+def make_inputs(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    names = list(SYMPTOM_SCORES)
+    start = date(2025, 1, 1)
+    return [(start + timedelta(days=rng.randrange(365)), rng.randint(21, 32),
+             rng.randint(2, 10), rng.sample(names, rng.randint(0, 4))) for _ in range(n)]
+
+
+async def time_path(path, today, inputs) -> float:
+    started = time.perf_counter()
+    for args in inputs:
+        await path(today, *args)
+    return time.perf_counter() - started
+
+
+async def run(rounds: int, repeat: int) -> dict:
+    today = date(2025, 6, 1)
+    inputs = make_inputs(rounds)
+    for args in inputs[:1000]:
+        if await legacy_path(today, *args) != await typed_path(today, *args):
+            raise AssertionError(f"responses differ for {args}")
+
+    legacy = min([await time_path(legacy_path, today, inputs) for _ in range(repeat)])
+    typed = min([await time_path(typed_path, today, inputs) for _ in range(repeat)])
+    return {
+        "rounds": rounds,
+        "legacy_us_per_call": round(legacy / rounds * 1e6, 2),
+        "typed_us_per_call": round(typed / rounds * 1e6, 2),
+        "speedup": round(legacy / typed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.rounds, args.repeat)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Symptom scoring from JSON string lists against registry bitmasks.
+
+For each size, times the old path (loop over every user's list of names
+and look each one up in SYMPTOM_SCORES), scalar scoring of stored masks,
+and vectorized scoring of a mask array. Encoding the lists to
+masks, a one-off on write, is timed separately. Also compares storage:
+the JSON text of the lists against one int64 per row.
+
+    python -m benchmarks.bench_symptom_scoring --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from utils.symptoms import SYMPTOM_SCORES, SYMPTOMS
+
+
+def make_symptom_lists(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    names = list(SYMPTOMS.names)
+    return [rng.sample(names, rng.randint(0, 4)) for _ in range(n)]
+
+
+def legacy_scores(symptom_lists):
+    scores = []
+    for symptoms in symptom_lists:
+        score = 0
+        for s in symptoms:
+            if s in SYMPTOM_SCORES:
+                score += SYMPTOM_SCORES[s]
+        scores.append(score)
+    return scores
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def run(n: int) -> dict:
+    symptom_lists = make_symptom_lists(n)
+    encode_seconds, masks = timed(lambda: SYMPTOMS.encode_many(symptom_lists))
+    legacy_seconds, legacy = timed(lambda: legacy_scores(symptom_lists))
+    scalar_seconds, scalar = timed(lambda: [SYMPTOMS.score(m) for m in masks.tolist()])
+    vector_seconds, vector = timed(lambda: SYMPTOMS.scores(masks))
+    if not legacy == scalar == vector.tolist():
+        raise AssertionError("mask scores differ from the string lookup")
+    json_bytes = sum(len(json.dumps(s)) for s in symptom_lists)
+    return {
+        "users": n,
+        "legacy_ns_per_user": round(legacy_seconds / n * 1e9),
+        "mask_scalar_ns_per_user": round(scalar_seconds / n * 1e9),
+        "mask_vectorized_ns_per_user": round(vector_seconds / n * 1e9, 1),
+        "vectorized_speedup": round(legacy_seconds / vector_seconds, 1),
+        "encode_ns_per_user": round(encode_seconds / n * 1e9),
+        "json_bytes_per_user": round(json_bytes / n, 1),
+        "mask_bytes_per_user": masks.itemsize,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+    print(json.dumps({"symptoms": len(SYMPTOMS.names),
+                      "sizes": [run(n) for n in args.sizes]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
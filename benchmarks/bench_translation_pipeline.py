@@ -0,0 +1,90 @@
+"""Throughput of the micro-batching translation pipeline.
+
+Fires --texts translation requests at --concurrency across the four
+non-English languages. The echo backend stands in for a provider with a
+fixed --call-ms round trip and at most --backend-slots calls in flight,
+which is what limits one-request-per-text in practice. Runs once with
+batching off (batch size 1) and once per --batch-sizes value.
+
+    python -m benchmarks.bench_translation_pipeline --texts 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from services.translation_pipeline import EchoBackend, TranslationPipeline
+
+LANGUAGES = ("yo", "ig", "ha", "pcm")
+
+
+class LimitedEchoBackend(EchoBackend):
+    def __init__(self, call_seconds: float, slots: int):
+        super().__init__(call_seconds)
+        self._slots = asyncio.Semaphore(slots)
+
+    async def translate_batch(self, texts, language):
+        async with self._slots:
+            return await super().translate_batch(texts, language)
+
+
+def make_requests(n: int, distinct: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [(f"Reply number {rng.randrange(distinct)} about your cycle.", rng.choice(LANGUAGES))
+            for _ in range(n)]
+
+
+async def run(requests, concurrency: int, batch_size: int, wait_ms: float,
+              call_seconds: float, slots: int) -> dict:
+    backend = LimitedEchoBackend(call_seconds, slots)
+    pipeline = TranslationPipeline(lambda: backend, max_batch=batch_size, max_wait_ms=wait_ms)
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(text, language):
+        async with gate:
+            started = time.perf_counter()
+            result = await pipeline.translate(text, language)
+            latencies.append(time.perf_counter() - started)
+            assert result == f"[{language}] {text}"
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(text, language) for text, language in requests))
+    seconds = time.perf_counter() - started
+    await pipeline.close()
+    latencies.sort()
+    return {
+        "batch_size": batch_size,
+        "seconds": round(seconds, 3),
+        "texts_per_sec": round(len(requests) / seconds),
+        "backend_calls": backend.calls,
+        "texts_per_call": round(len(requests) / backend.calls, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--wait-ms", type=float, default=5)
+    parser.add_argument("--call-ms", type=float, default=50)
+    parser.add_argument("--backend-slots", type=int, default=4)
+    args = parser.parse_args()
+
+    requests = make_requests(args.texts, args.distinct)
+    results = [asyncio.run(run(requests, args.concurrency, size, args.wait_ms,
+                               args.call_ms / 1000, args.backend_slots))
+               for size in [1, *args.batch_sizes]]
+    print(json.dumps({"texts": args.texts, "concurrency": args.concurrency,
+                      "call_ms": args.call_ms, "backend_slots": args.backend_slots,
+                      "runs": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
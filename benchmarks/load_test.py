@@ -0,0 +1,329 @@
+"""End-to-end latency and throughput of the main routes under a mixed workload.
+
+Boots main.app in-process over ASGI against a fresh SQLite file (or the
+database given with --database-url, e.g. a local Postgres), seeds
+`--users` synthetic users with a profile, a cycle history, its
+cycle_stats row and an insight, then sends `--requests` requests drawn
+from a weighted mix of routes with `--concurrency` in flight:
+
+    login         POST /auth/token (bcrypt verify)
+    profile       GET  /user/profile
+    cycle_post    POST /cycle/cycles
+    insight_post  POST /insights/insights
+    chat          POST /chat/ (fake LLM, echo translation)
+
+The schedule (route, user and body of every request) comes from `--seed`,
+so two runs with the same arguments send the same requests. Per-route
+count, errors, p50/p95/p99 and rps are printed as JSON; `--output` also
+writes them to a file and `--baseline` adds the ratio to an earlier one.
+
+Settings the app reads at import (LLM_PROVIDER, TRANSLATION_BACKEND,
+FAKE_LLM_FIRST_TOKEN_SECONDS, ...) can be overridden from the environment;
+background workers are off unless asked for.
+
+    python -m benchmarks.load_test --users 200 --requests 5000 --concurrency 50
+    python -m benchmarks.load_test --db async --output async.json --baseline sync.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+
+
+DEFAULT_MIX = "login=1,profile=4,cycle_post=2,insight_post=2,chat=1"
+PASSWORD = "load-test-password"
+SYMPTOM_CHOICES = ["cramps", "bloating", "headache", "fatigue", "mood swings",
+                   "acne", "breast tenderness", "back pain"]
+CHAT_MESSAGES = [
+    "When am I most fertile?",
+    "Is a 35 day cycle normal?",
+    "What can I do about period cramps?",
+    "How long does ovulation last?",
+    "Can stress delay my period?",
+    "What foods help with bloating?",
+]
+APP_ENV_DEFAULTS = {
+    "SECRET_KEY": "load-test-secret",
+    "ALGORITHM": "HS256",
+    "LLM_PROVIDER": "fake",
+    "TRANSLATION_BACKEND": "echo",
+    "EMAIL_TRANSPORT": "memory",
+    "EMAIL_WORKER_ENABLED": "false",
+    "SWEEPER_ENABLED": "false",
+    "INSIGHT_PRECOMPUTE_ENABLED": "false",
+    # Request logs would go to the same stdout as the report
+    "LOG_LEVEL": "WARNING",
+}
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        route, _, weight = item.partition("=")
+        if route not in ROUTES:
+            raise SystemExit(f"unknown route {route!r}, expected one of {', '.join(ROUTES)}")
+        mix[route] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    # Nearest rank, so every reported value is a latency that was observed
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: list, errors: dict, seconds: float) -> dict:
+    ordered = sorted(latencies)
+    ms = lambda value: round(value * 1000, 2)
+    return {
+        "count": len(ordered),
+        "errors": sum(errors.values()),
+        "error_statuses": dict(sorted(errors.items())),
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else 0.0,
+        "rps": round(len(ordered) / seconds, 1) if seconds else 0.0,
+    }
+
+
+class User:
+    __slots__ = ("id", "email", "token", "cycle_length", "period_length", "last_period_date")
+
+    def __init__(self, id, email, token, cycle_length, period_length, last_period_date):
+        self.id = id
+        self.email = email
+        self.token = token
+        self.cycle_length = cycle_length
+        self.period_length = period_length
+        self.last_period_date = last_period_date
+
+
+def seed_users(count: int, history: int, rng: random.Random) -> list:
+    """Insert `count` users with `history` cycles each and return them with
+    a fresh access token. Everyone shares one bcrypt hash of PASSWORD, so
+    seeding doesn't pay for `count` hashes."""
+    from database import SessionLocal
+    from models import Cycles, CycleStats, Insights, UserProfile, Users
+    from services.password_hasher import bcrypt_context
+    from utils.cycle_estimator import summarize_cycles
+    from utils.enum import LanguageEnum
+    from utils.predictions import predict_cycle
+    from utils.symptoms import SYMPTOMS
+    from utils.utils import create_access_token
+
+    hashed_password = bcrypt_context.hash(PASSWORD)
+    run = uuid.uuid4().hex[:8]
+    languages = list(LanguageEnum)
+    today = date.today()
+    users = []
+
+    with SessionLocal() as db:
+        rows = [Users(email=f"load-{run}-{i}@example.com", username=f"load-{run}-{i}",
+                      first_name="Load", last_name=f"User{i}", hashed_password=hashed_password,
+                      phone_number=f"+234800{i:07d}", is_verified=True,
+                      language_preference=rng.choice(languages))
+                for i in range(count)]
+        db.add_all(rows)
+        db.flush()
+
+        for row in rows:
+            cycle_length, period_length = rng.randint(24, 32), rng.randint(3, 7)
+            start = today - timedelta(days=rng.randint(0, cycle_length - 1))
+            cycles = []
+            for n in reversed(range(history)):
+                length = max(21, min(35, cycle_length + rng.randint(-2, 2)))
+                cycles.append((start - timedelta(days=cycle_length * n), length, period_length))
+            symptoms = rng.sample(SYMPTOM_CHOICES, rng.randint(0, 3))
+
+            db.add(UserProfile(user_id=row.id, age=rng.randint(20, 42), cycle_length=cycle_length,
+                               period_length=period_length, last_period_date=start))
+            db.add_all(Cycles(user_id=row.id, last_period_date=d, cycle_length=length,
+                              period_length=p, symptoms=symptoms, symptom_mask=SYMPTOMS.encode(symptoms))
+                       for d, length, p in cycles)
+            db.add(CycleStats(user_id=row.id, **summarize_cycles(cycles)._asdict()))
+            prediction = predict_cycle(cycle_length=cycle_length, last_period_date=start,
+                                       period_length=period_length, symptoms=symptoms)
+            db.add(Insights(user_id=row.id, next_period=prediction.next_period,
+                            ovulation_day=prediction.ovulation_day,
+                            fertile_period_start=prediction.fertile_start,
+                            fertile_period_end=prediction.fertile_end,
+                            symptoms=symptoms, symptom_mask=SYMPTOMS.encode(symptoms),
+                            insight_text="Seeded insight"))
+
+            token = create_access_token(row.email, row.id, row.role, timedelta(hours=2))
+            users.append(User(row.id, row.email, token, cycle_length, period_length, start))
+        db.commit()
+    return users
+
+
+def cycle_body(user: User, rng: random.Random) -> dict:
+    # The next period after the last one this schedule posted for the user
+    user.last_period_date += timedelta(days=user.cycle_length + rng.randint(-2, 2))
+    return {"last_period_date": user.last_period_date.isoformat(),
+            "cycle_length": user.cycle_length, "period_length": user.period_length,
+            "symptoms": rng.sample(SYMPTOM_CHOICES, rng.randint(0, 3))}
+
+
+def insight_body(user: User, rng: random.Random) -> dict:
+    return {"last_period_date": user.last_period_date.isoformat(),
+            "cycle_length": user.cycle_length, "period_length": user.period_length,
+            "symptoms": rng.sample(SYMPTOM_CHOICES, rng.randint(0, 3))}
+
+
+# route -> (method, path, authenticated, body builder)
+ROUTES = {
+    "login": ("POST", "/auth/token", False,
+              lambda user, rng: {"email": user.email, "password": PASSWORD}),
+    "profile": ("GET", "/user/profile", True, None),
+    "cycle_post": ("POST", "/cycle/cycles", True, cycle_body),
+    "insight_post": ("POST", "/insights/insights", True, insight_body),
+    "chat": ("POST", "/chat/", True,
+             lambda user, rng: {"message": rng.choice(CHAT_MESSAGES)}),
+}
+
+
+def build_schedule(users: list, mix: dict, requests: int, rng: random.Random) -> list:
+    routes, weights = list(mix), list(mix.values())
+    schedule = []
+    for route in rng.choices(routes, weights, k=requests):
+        user = rng.choice(users)
+        method, path, authenticated, body = ROUTES[route]
+        headers = {"Authorization": f"Bearer {user.token}"} if authenticated else {}
+        schedule.append((route, method, path, headers, body(user, rng) if body else None))
+    return schedule
+
+
+async def drive(app, schedule: list, warmup: list, concurrency: int):
+    import httpx
+
+    latencies = defaultdict(list)
+    errors = defaultdict(lambda: defaultdict(int))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(request, record):
+            route, method, path, headers, body = request
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, headers=headers, json=body)
+                    outcome = response.status_code
+                except Exception as e:
+                    outcome = type(e).__name__
+                elapsed = time.perf_counter() - started
+            if record:
+                latencies[route].append(elapsed)
+                if not isinstance(outcome, int) or outcome >= 400:
+                    errors[route][str(outcome)] += 1
+
+        await asyncio.gather(*(one(request, False) for request in warmup))
+        started = time.perf_counter()
+        await asyncio.gather(*(one(request, True) for request in schedule))
+        seconds = time.perf_counter() - started
+    return latencies, errors, seconds
+
+
+def run(args) -> dict:
+    for name, value in APP_ENV_DEFAULTS.items():
+        os.environ.setdefault(name, value)
+    os.environ["USE_ASYNC_DB"] = "true" if args.db == "async" else "false"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/load_test.db"
+
+        import main
+        from database import dispose_engines
+
+        rng = random.Random(args.seed)
+        seeding_started = time.perf_counter()
+        users = seed_users(args.users, args.history, rng)
+        seeding_seconds = time.perf_counter() - seeding_started
+
+        mix = parse_mix(args.mix)
+        warmup = build_schedule(users, mix, args.warmup, rng)
+        schedule = build_schedule(users, mix, args.requests, rng)
+
+        async def go():
+            try:
+                return await drive(main.app, schedule, warmup, args.concurrency)
+            finally:
+                await dispose_engines()
+
+        latencies, errors, seconds = asyncio.run(go())
+
+    routes = {route: summarize(latencies[route], errors[route], seconds) for route in mix}
+    overall = summarize([value for values in latencies.values() for value in values],
+                        {status: n for route in errors.values() for status, n in route.items()}, seconds)
+    return {
+        "config": {
+            "database": (args.database_url or "sqlite").split(":", 1)[0],
+            "db_session": args.db,
+            "users": args.users,
+            "history": args.history,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "mix": mix,
+            "seed": args.seed,
+            "llm_provider": os.environ["LLM_PROVIDER"],
+            "translation_backend": os.environ["TRANSLATION_BACKEND"],
+        },
+        "seeding_seconds": round(seeding_seconds, 3),
+        "seconds": round(seconds, 3),
+        "overall": overall,
+        "routes": routes,
+    }
+
+
+def compare(result: dict, baseline: dict) -> dict:
+    """This run's p50/p95/p99 and rps divided by the baseline's, per route."""
+    ratios = {}
+    for route, current in [("overall", result["overall"]), *result["routes"].items()]:
+        before = baseline["overall"] if route == "overall" else baseline["routes"].get(route)
+        if not before:
+            continue
+        ratios[route] = {key: round(current[key] / before[key], 3)
+                         for key in ("p50_ms", "p95_ms", "p99_ms", "rps") if before[key]}
+    return ratios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--history", type=int, default=6, help="cycles seeded per user")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200, help="requests sent before timing starts")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route=weight pairs, comma separated")
+    parser.add_argument("--db", choices=["sync", "async"], default="sync",
+                        help="session path, as USE_ASYNC_DB")
+    parser.add_argument("--database-url", help="seed and load this database instead of a temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--baseline", help="a report from an earlier run to compare against")
+    args = parser.parse_args()
+
+    result = run(args)
+    if args.baseline:
+        with open(args.baseline) as f:
+            result["vs_baseline"] = compare(result, json.load(f))
+    report = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Per-call cost of the pure-Python functions on the request path, with a regression gate.
+
+Each case is timed with timeit at every `--sizes` batch size: size 1
+calls the function on one fixed input, larger sizes walk through that
+many different inputs, so branchy code sees a realistic mix. Inputs come
+from `--seed`. The best of `--repeat` runs is reported in ns per call.
+
+--save writes the results as a baseline; --baseline compares against
+one and exits with status 1 if any case got slower than `--threshold`
+(0.2 = 20%). Baselines are only comparable on the machine they were
+recorded on, and on a quiet one: record the baseline and the run under
+test back to back, or raise the threshold on shared CI runners.
+
+get_current_user is timed twice. The plain case is the warm path: every
+token has been seen before and is served from the verified-token cache.
+get_current_user_cold empties that cache before each batch, so every
+call pays for the full JWT decode and signature check.
+
+    python -m benchmarks.microbench --save baseline.json
+    python -m benchmarks.microbench --baseline baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+from datetime import date, timedelta
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from services.auth_tokens import token_verifier
+from services.insights_engine import RULE_TABLE, generate_insight_key
+from services.translator import translate_insight
+from utils.enum import LanguageEnum
+from utils.predictions import simple_fertility_ai
+from utils.utility import cycle_calculation, symptoms_and_recommendation
+from utils.utils import create_access_token, generate_otp, get_current_user
+
+
+TODAY = date(2025, 6, 1)
+SYMPTOMS = ["cramps", "bloating", "headache", "fatigue", "mood swings", "acne", "back pain"]
+
+CASES = {}
+
+
+def case(name):
+    def register(build):
+        CASES[name] = build
+        return build
+    return register
+
+
+def run_coroutine(coro):
+    # For coroutines that never suspend: skips the event loop's own overhead
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coro.close()
+    raise RuntimeError("coroutine suspended")
+
+
+def cycle_input(rng: random.Random) -> dict:
+    return {
+        "cycle_length": rng.randint(21, 35),
+        "last_period_date": TODAY - timedelta(days=rng.randrange(40)),
+        "period_length": rng.randint(2, 8),
+        "symptoms": rng.sample(SYMPTOMS, rng.randint(0, 4)),
+    }
+
+
+# Each builder returns a callable making `size` calls on seeded inputs
+
+@case("simple_fertility_ai")
+def _(rng, size):
+    inputs = [cycle_input(rng) for _ in range(size)]
+    return lambda: [simple_fertility_ai(**kwargs) for kwargs in inputs]
+
+
+@case("generate_insight_key")
+def _(rng, size):
+    inputs = [(TODAY - timedelta(days=rng.randint(-20, 20)), rng.randint(40, 100)) for _ in range(size)]
+    return lambda: [generate_insight_key(today=TODAY, ovulation_day=ovulation, fertility_score=score)
+                    for ovulation, score in inputs]
+
+
+@case("translate_insight")
+def _(rng, size):
+    languages = [language.value for language in LanguageEnum]
+    inputs = [(rng.choice(RULE_TABLE.keys), rng.choice(languages)) for _ in range(size)]
+    return lambda: [translate_insight(key, language) for key, language in inputs]
+
+
+@case("cycle_calculation")
+def _(rng, size):
+    inputs = [(TODAY - timedelta(days=rng.randrange(40)), rng.randint(2, 8), rng.randint(21, 35))
+              for _ in range(size)]
+    return lambda: [cycle_calculation(start, period_length, cycle_length)
+                    for start, period_length, cycle_length in inputs]
+
+
+@case("symptoms_and_recommendation")
+def _(rng, size):
+    inputs = [(rng.randint(1, 35), 28) for _ in range(size)]
+    return lambda: [symptoms_and_recommendation(days, cycle_length) for days, cycle_length in inputs]
+
+
+@case("create_access_token")
+def _(rng, size):
+    inputs = [(f"user{i}@example.com", rng.randrange(1, 10 ** 6)) for i in range(size)]
+    hour = timedelta(hours=1)
+    return lambda: [create_access_token(email, user_id, "user", hour) for email, user_id in inputs]
+
+
+@case("get_current_user")
+def _(rng, size):
+    tokens = [create_access_token(f"user{i}@example.com", rng.randrange(1, 10 ** 6), "user",
+                                  timedelta(hours=1)) for i in range(size)]
+    return lambda: [run_coroutine(get_current_user(token)) for token in tokens]
+
+
+@case("get_current_user_cold")
+def _(rng, size):
+    tokens = [create_access_token(f"user{i}@example.com", rng.randrange(1, 10 ** 6), "user",
+                                  timedelta(hours=1)) for i in range(size)]
+
+    def run():
+        # Every token in a batch is distinct, so each call misses
+        token_verifier.cache._entries.clear()
+        return [run_coroutine(get_current_user(token)) for token in tokens]
+    return run
+
+
+@case("generate_otp")
+def _(rng, size):
+    # generate_otp draws from the module-level generator
+    random.seed(rng.random())
+    return lambda: [generate_otp() for _ in range(size)]
+
+
+def measure(fn, size: int, repeat: int) -> float:
+    """Best ns per call over `repeat` runs of ~20ms each.
+
+    Interference from other processes only ever adds time, so the minimum
+    of many short runs moves much less between runs than a mean, or the
+    minimum of a few long ones.
+    """
+    timer = timeit.Timer(fn)
+    number = max(1, timer.autorange()[0] // 10)
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return round(best / (number * size) * 1e9, 1)
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """Ratio of each case to the baseline, and the cases past `threshold`."""
+    ratios, regressions = {}, []
+    for name, sizes in results.items():
+        for size, ns in sizes.items():
+            before = baseline.get(name, {}).get(size)
+            if not before:
+                continue
+            ratio = round(ns / before, 3)
+            ratios.setdefault(name, {})[size] = ratio
+            if ratio > 1 + threshold:
+                regressions.append({"case": name, "size": int(size), "baseline_ns": before,
+                                    "ns": ns, "ratio": ratio})
+    return ratios, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 1000])
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), help="default: all")
+    parser.add_argument("--save", help="write the results to this baseline file")
+    parser.add_argument("--baseline", help="compare against this baseline file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown before a case counts as a regression")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.cases or CASES:
+        for size in args.sizes:
+            fn = CASES[name](random.Random(args.seed), size)
+            # JSON keys are strings; use them here too so baselines compare directly
+            results.setdefault(name, {})[str(size)] = measure(fn, size, args.repeat)
+
+    report = {
+        "python": platform.python_version(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "ns_per_call": results,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        ratios, regressions = compare(results, baseline["ns_per_call"], args.threshold)
+        report.update(baseline_python=baseline.get("python"), threshold=args.threshold,
+                      vs_baseline=ratios, regressions=regressions)
+    print(json.dumps(report, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,15 @@
-from sqlalchemy import create_engine
+import time
+from contextlib import asynccontextmanager
+from typing import Annotated
+from fastapi import Depends
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from utils.instrumentation import METRICS_ENABLED, instrument_engine
+from utils.metrics import Counter, Gauge, Histogram
 import os
 
 # Read DB URL from environment (Render) or fallback to SQLite (local)
@@ -11,12 +21,104 @@ if DATABASE_URL.startswith("postgresql"):
         "postgresql://", "postgresql+psycopg2://"
     )
 
+# Opt-in async engine (asyncpg on Postgres, aiosqlite locally)
+USE_ASYNC_DB = os.getenv("USE_ASYNC_DB", "false").lower() == "true"
+
+# Pool sizing. pool_recycle keeps connections younger than the server's idle
+# cutoff, so the extra pre-ping round-trip is off unless asked for.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+SQLITE_WAL = os.getenv("SQLITE_WAL", "true").lower() == "true"
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+pool_checkout_seconds = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to obtain a connection from the pool", ("engine",))
+pool_wait_seconds_total = Counter(
+    "db_pool_wait_seconds_total",
+    "Time spent waiting for a connection while the pool was exhausted", ("engine",))
+pool_timeouts_total = Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT", ("engine",))
+pool_checked_out = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool", ("engine",))
+
+
+class _InstrumentedPoolMixin:
+    engine_label = "sync"
+
+    def _do_get(self):
+        exhausted = self._pool.empty() and self._overflow >= self._max_overflow
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            pool_timeouts_total.inc(engine=self.engine_label)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            pool_checkout_seconds.observe(elapsed, engine=self.engine_label)
+            if exhausted:
+                pool_wait_seconds_total.inc(elapsed, engine=self.engine_label)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    engine_label = "sync"
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    engine_label = "async"
+
+
+def _pool_options(poolclass) -> dict:
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    if SQLITE_WAL:
+        # WAL lets readers run while a request is writing
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA cache_size=-20000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _track_checkouts(sync_engine, label: str):
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_checked_out.inc(engine=label)
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        pool_checked_out.dec(engine=label)
+
+
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,
     connect_args={
-        "check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+        "check_same_thread": False} if IS_SQLITE else {},
+    **_pool_options(InstrumentedQueuePool)
 )
+_track_checkouts(engine, "sync")
+if METRICS_ENABLED:
+    instrument_engine(engine, "sync")
+if IS_SQLITE:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -25,3 +127,136 @@ SessionLocal = sessionmaker(
 )
 
 Base = declarative_base()
+
+
+def to_async_url(url: str) -> str:
+    if url.startswith("postgresql+psycopg2://"):
+        return url.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if USE_ASYNC_DB:
+    async_engine = create_async_engine(
+        to_async_url(DATABASE_URL),
+        **_pool_options(InstrumentedAsyncQueuePool)
+    )
+    _track_checkouts(async_engine.sync_engine, "async")
+    if METRICS_ENABLED:
+        instrument_engine(async_engine.sync_engine, "async")
+    if IS_SQLITE:
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    # Attributes must stay loaded after commit: lazy refreshes can't run
+    # outside the greenlet the AsyncSession uses for IO.
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+class SyncSessionAdapter:
+    """Gives a sync Session the same awaitable API as AsyncSession.
+
+    Routers are written once against the AsyncSession call signatures; in
+    sync mode each blocking call is pushed to the threadpool so the event
+    loop stays free either way.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        # Buffer the rows in the worker thread, like AsyncSession.scalars does
+        frozen = await run_in_threadpool(
+            lambda: self.sync_session.execute(statement, *args, **kwargs).freeze())
+        return frozen().scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+@asynccontextmanager
+async def session_scope():
+    """A session for work outside a request (background workers, jobs)."""
+    if USE_ASYNC_DB:
+        async with AsyncSessionLocal() as session:
+            yield session
+    else:
+        db = SyncSessionAdapter(SessionLocal())
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+async def dispose_engines():
+    """Close pooled connections; aiosqlite's threads otherwise keep the process alive."""
+    if async_engine is not None:
+        await async_engine.dispose()
+    await run_in_threadpool(engine.dispose)
+
+
+async def get_db():
+    async with session_scope() as db:
+        yield db
+
+
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+
+
+def pool_stats() -> dict:
+    engines = {"sync": engine}
+    if async_engine is not None:
+        engines["async"] = async_engine.sync_engine
+    stats = {}
+    for label, eng in engines.items():
+        pool = eng.pool
+        stats[label] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "timeout": DB_POOL_TIMEOUT,
+            "recycle": DB_POOL_RECYCLE,
+            "pre_ping": DB_POOL_PRE_PING,
+            "wait_seconds_total": round(pool_wait_seconds_total.value(engine=label), 6),
+            "timeouts_total": pool_timeouts_total.value(engine=label),
+            "checkout_seconds": pool_checkout_seconds.snapshot().get(label, {}),
+        }
+    return stats
@@ -1,16 +1,52 @@
+import logging
 import os
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from sqlalchemy import create_engine, text
-from routers import auth, cycles, insights, users, messages
+from sqlalchemy.orm.exc import StaleDataError
+from routers import auth, cycles, insights, internal, users, messages
 from fastapi.middleware.cors import CORSMiddleware
 import models
-from database import engine
+from database import async_engine, dispose_engines, engine
+from services.email_outbox import EMAIL_WORKER_ENABLED, email_worker
+from services.expiry_sweeper import SWEEPER_ENABLED, expiry_sweeper
+from services.insight_precompute import INSIGHT_PRECOMPUTE_ENABLED, insight_scheduler
+from services.llm_client import llm_client
+from services.password_hasher import password_hasher
+from services.request_profiler import PROFILING_ENABLED, ProfilingMiddleware, request_profiler
+from services.translation_pipeline import translation_pipeline
+from services.translator import translation_cache
+from utils.instrumentation import METRICS_ENABLED, RequestMetricsMiddleware, metrics_response
+from utils.logging_config import RequestIdMiddleware, configure_logging
 
+configure_logging()
+logger = logging.getLogger(__name__)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        logger.info("Translation cache warmed", extra={"entries": await translation_cache.warm()})
+    except Exception:
+        logger.exception("Translation cache warm-up failed")
+    if EMAIL_WORKER_ENABLED:
+        email_worker.start()
+    if SWEEPER_ENABLED:
+        expiry_sweeper.start()
+    if INSIGHT_PRECOMPUTE_ENABLED:
+        insight_scheduler.start()
+    yield
+    await insight_scheduler.stop()
+    await expiry_sweeper.stop()
+    await email_worker.stop()
+    await llm_client.close()
+    await translation_pipeline.close()
+    password_hasher.shutdown()
+    await dispose_engines()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS setup
 origins = [
@@ -28,15 +64,33 @@ app.add_middleware(
     allow_headers=["*"],         # Allow all headers
 )
 
+if PROFILING_ENABLED:
+    # Inside the metrics and request id middlewares, so profiles carry the request id
+    app.add_middleware(ProfilingMiddleware)
+    request_profiler.instrument_engine(engine)
+    if async_engine is not None:
+        request_profiler.instrument_engine(async_engine.sync_engine)
+if METRICS_ENABLED:
+    app.add_middleware(RequestMetricsMiddleware)
+# Added last so it is outermost and every log line of a request carries its id
+app.add_middleware(RequestIdMiddleware)
+
 
 models.Base.metadata.create_all(bind=engine)
 
 
+@app.exception_handler(StaleDataError)
+async def stale_data_handler(request: Request, exc: StaleDataError):
+    # Another request updated the row (version_id) between our read and write
+    return JSONResponse(status_code=409, content={"detail": "The resource was modified concurrently, please retry."})
+
+
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(cycles.router)
 app.include_router(insights.router)
 app.include_router(messages.router)
+app.include_router(internal.router)
 
 
 @app.get("/")
@@ -44,3 +98,7 @@ async def root():
     return {"message": "Fertility FastAPI is running!"}
 
 
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics(request: Request):
+        return metrics_response(request)
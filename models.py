@@ -3,7 +3,7 @@ from datetime import date, datetime
 from typing import List, Optional
 import uuid
 from database import Base
-from sqlalchemy import Column, Date, DateTime, Integer, String, Boolean, ForeignKey, JSON, Enum as SQLEnum, Text
+from sqlalchemy import BigInteger, Column, Date, DateTime, Float, Index, Integer, String, Boolean, ForeignKey, JSON, Enum as SQLEnum, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 
@@ -32,11 +32,17 @@ class Users(Base):
         default=LanguageEnum.ENGLISH,
         nullable=False
     )
+    # Bumped by every ORM update (optimistic locking); response ETags are built from it
+    version_id: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
+    __mapper_args__ = {"version_id_col": version_id}
 
     profile: Mapped["UserProfile"] = relationship(
         "UserProfile", back_populates="user", uselist=False, cascade="all, delete")
-    cycle: Mapped["Cycles"] = relationship(
-        "Cycles", back_populates="user", uselist=False, cascade="all, delete")
+    cycles: Mapped[List["Cycles"]] = relationship(
+        "Cycles", back_populates="user", cascade="all, delete",
+        order_by="(Cycles.last_period_date.desc(), Cycles.id.desc())")
+    cycle_stats: Mapped["CycleStats"] = relationship(
+        "CycleStats", back_populates="user", uselist=False, cascade="all, delete")
     insights: Mapped["Insights"] = relationship(
         "Insights", back_populates="user", uselist=False, cascade="all, delete")
 
@@ -95,7 +101,7 @@ class PendingUser(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     phone_number: Mapped[str] = mapped_column(
         String, nullable=False, index=True)
-    email: Mapped[str] = mapped_column(String, nullable=False)
+    email: Mapped[str] = mapped_column(String, nullable=False, index=True)
     username: Mapped[str] = mapped_column(String, nullable=False)
     first_name: Mapped[str] = mapped_column(String, nullable=False)
     last_name: Mapped[str] = mapped_column(String, nullable=False)
@@ -104,7 +110,7 @@ class PendingUser(Base):
         SQLEnum(RoleEnum), default=RoleEnum.USER, nullable=False)
     language_preference: Mapped[LanguageEnum] = mapped_column(
         SQLEnum(LanguageEnum), default=LanguageEnum.ENGLISH, nullable=False)
-    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
 
 
 class UserProfile(Base):
@@ -121,6 +127,8 @@ class UserProfile(Base):
     ttc_history: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     faith_preference: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     audio_preference: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True)
+    version_id: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
+    __mapper_args__ = {"version_id_col": version_id}
 
     user: Mapped["Users"] = relationship("Users", back_populates="profile")
 
@@ -129,13 +137,17 @@ class PasswordResetToken(Base):
     __tablename__ = "password_reset_token"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     token: Mapped[str] = mapped_column(String, unique=True, index=True)
-    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
 
 
 class OTP(Base):
     __tablename__ = "otp"
+    __table_args__ = (
+        Index("ix_otp_phone_is_used", "phone", "is_used"),
+        Index("ix_otp_verification_id_is_used", "verification_id", "is_used"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     verification_id: Mapped[str] = mapped_column(
@@ -144,14 +156,52 @@ class OTP(Base):
     otp_hashed: Mapped[str] = mapped_column(String, nullable=False)
     attempts: Mapped[int] = mapped_column(Integer, default=0)
     is_used: Mapped[bool] = mapped_column(Boolean, default=False)
-    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    to_email: Mapped[str] = mapped_column(String, nullable=False)
+    subject: Mapped[str] = mapped_column(String, nullable=False)
+    html_content: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), default="pending", nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class ChatReplyCache(Base):
+    __tablename__ = "chat_reply_cache"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    cache_key: Mapped[str] = mapped_column(String(64), unique=True, index=True, nullable=False)
+    language: Mapped[str] = mapped_column(String(10), nullable=False)
+    prompt: Mapped[str] = mapped_column(Text, nullable=False)
+    reply: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
 
 
 class CashedTranslations(Base):
   __tablename__ = "cached_translations"
+  __table_args__ = (
+      Index("ix_cached_translations_language_text_hash", "language", "text_hash", unique=True),
+  )
 
   id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
   original_text: Mapped[str] = mapped_column(Text, nullable=False)
+  # sha256 of original_text, so lookups never compare the full text
+  text_hash: Mapped[str] = mapped_column(String(64), nullable=False)
   translated_text: Mapped[str] = mapped_column(Text, nullable=False)
   language: Mapped[str] = mapped_column(String(10), nullable=False)
 
@@ -160,15 +210,44 @@ class Cycles(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey(
-        "users.id", ondelete="CASCADE"), unique=True)
+        "users.id", ondelete="CASCADE"), nullable=False)
 
     last_period_date: Mapped[Date] = mapped_column(Date, nullable=False)
     cycle_length: Mapped[int] = mapped_column(Integer, default=28)
     period_length: Mapped[int] = mapped_column(Integer, default=5)
 
     symptoms: Mapped[List[str]] = mapped_column(JSON, default=list)
+    # utils.symptoms.SYMPTOMS bitmask of `symptoms`, what scoring reads
+    symptom_mask: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default="0", nullable=False)
+    version_id: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
+    __mapper_args__ = {"version_id_col": version_id}
+
+    user: Mapped["Users"] = relationship("Users", back_populates="cycles")
+
+
+# Newest first per user: history pages and "last N cycles" are one range scan
+Index("ix_cycles_user_id_last_period_date",
+    Cycles.user_id, Cycles.last_period_date.desc(), Cycles.id.desc())
+
+
+class CycleStats(Base):
+    """Running cycle-length estimate of one user (utils.cycle_estimator),
+    so predictions never rescan the cycle history."""
+    __tablename__ = "cycle_stats"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey(
+        "users.id", ondelete="CASCADE"), primary_key=True)
+    last_period_date: Mapped[date] = mapped_column(Date, nullable=False)
+    cycles_observed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    mean_length: Mapped[float] = mapped_column(Float, nullable=False)
+    var_length: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    period_length: Mapped[float] = mapped_column(Float, nullable=False)
+    reported_length: Mapped[int] = mapped_column(Integer, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
-    user: Mapped["Users"] = relationship("Users", back_populates="cycle")
+    user: Mapped["Users"] = relationship("Users", back_populates="cycle_stats")
 
 
 class Insights(Base):
@@ -184,6 +263,10 @@ class Insights(Base):
     fertile_period_end: Mapped[date] = mapped_column(Date, nullable=False)
 
     symptoms: Mapped[List[str]] = mapped_column(JSON, default=list)
+    symptom_mask: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default="0", nullable=False)
     insight_text: Mapped[str] = mapped_column(Text, nullable=False)
+    version_id: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
+    __mapper_args__ = {"version_id_col": version_id}
 
     user: Mapped["Users"] = relationship("Users", back_populates="insights")
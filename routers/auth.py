@@ -1,14 +1,17 @@
+import asyncio
+import logging
 from datetime import datetime, timedelta, timezone
 import json
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, Body, status
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
-from typing import Annotated
-from database import SessionLocal
+from sqlalchemy import delete, or_, select
+from database import db_dependency
 from models import OTP, PasswordResetToken, PendingUser, RoleEnum, Users, LanguageEnum
 from schemas import CreateUserRequest, ForgotPasswordRequest, ResetPasswordRequest, Token, LoginRequest
-from utils.utils import bcrypt_context, authenticate_user, create_access_token, generate_otp, hash_otp, send_password_reset_email, verify_otp_hash, send_otp_email, send_otp_sms
+from services.password_hasher import password_hasher
+from services.email_outbox import email_worker
+from utils.logging_config import mask_email, mask_phone
+from utils.utils import authenticate_user, create_access_token, generate_otp, hash_otp, queue_password_reset_email, verify_otp_hash, queue_otp_email, send_otp_sms
 from fastapi.security import OAuth2PasswordRequestForm
 from dotenv import load_dotenv
 import os
@@ -17,39 +20,32 @@ load_dotenv()
 
 USE_SMS = os.getenv("USE_SMS", "false").lower() == "true"
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/auth",
     tags=["auth"]
 )
 
-# Dependency to get DB session
-
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
-
-
 @router.post("/send-otp", status_code=status.HTTP_200_OK)
 async def send_otp_registration(
     db: db_dependency,
     create_user_request: CreateUserRequest
 ):
-    print("Received send-otp request:", create_user_request.dict())
+    # Never the whole request: it carries the password
+    logger.debug("send-otp request", extra={
+        "email": mask_email(create_user_request.email),
+        "phone": mask_phone(create_user_request.phone_number),
+        "language": create_user_request.language_preference,
+    })
 
     # Check if email or username already exists
-    existing = db.query(Users).filter(
+    existing = (await db.scalars(select(Users).where(
         or_(
             Users.email == create_user_request.email,
             Users.username == create_user_request.username
         )
-    ).first()
+    ))).first()
 
     if existing:
         raise HTTPException(
@@ -58,19 +54,22 @@ async def send_otp_registration(
         )
 
     otp_code = generate_otp()
-    otp_hashed = hash_otp(otp_code)
+    otp_hashed, hashed_password = await asyncio.gather(
+        hash_otp(otp_code),
+        password_hasher.hash(create_user_request.password)
+    )
     expires_at = datetime.utcnow() + timedelta(minutes=10)
 
     # Create OTP and pending user in DB
     try:
         # Clear previous OTPs and pending registrations
-        db.query(OTP).filter(
+        await db.execute(delete(OTP).where(
             OTP.phone == create_user_request.phone_number,
             OTP.is_used == False
-        ).delete()
-        db.query(PendingUser).filter(
+        ))
+        await db.execute(delete(PendingUser).where(
             PendingUser.phone_number == create_user_request.phone_number
-        ).delete()
+        ))
 
         # OTP record
         otp_record = OTP(
@@ -89,7 +88,7 @@ async def send_otp_registration(
             username=create_user_request.username,
             first_name=create_user_request.first_name,
             last_name=create_user_request.last_name,
-            hashed_password=bcrypt_context.hash(create_user_request.password),
+            hashed_password=hashed_password,
             role=RoleEnum(create_user_request.role),
             language_preference=LanguageEnum(
                 create_user_request.language_preference),
@@ -97,34 +96,35 @@ async def send_otp_registration(
         )
         db.add(pending_user)
 
-        db.commit()
-        db.refresh(otp_record)
+        # Email goes out through the outbox, committed with the OTP itself
+        if not USE_SMS:
+            queue_otp_email(db, create_user_request.email, otp_code)
+
+        await db.commit()
+        await db.refresh(otp_record)
 
-    except Exception as e:
-        db.rollback()
-        print("[ERROR] DB transaction failed:", repr(e))
+    except Exception:
+        await db.rollback()
+        logger.exception("Failed to store OTP and pending user")
         raise HTTPException(
             status_code=500,
             detail="Failed to create OTP and pending user. Please try again."
         )
 
     # Send OTP (outside DB transaction)
-    print("USE_SMS:", USE_SMS)
     try:
         if USE_SMS:
-            print("Sending OTP via SMS to:", create_user_request.phone_number)
             send_otp_sms(
                 create_user_request.phone_number,
                 f"Your verification code is {otp_code}"
             )
-            print("OTP SMS sent successfully!")
+            logger.info("OTP sent by SMS", extra={"phone": mask_phone(create_user_request.phone_number)})
         else:
-            print("Sending OTP via email to:", create_user_request.email)
-            send_otp_email(create_user_request.email, otp_code)
-            print("OTP email sent successfully!")
+            email_worker.wake()
+            logger.info("OTP email queued", extra={"email": mask_email(create_user_request.email)})
 
-    except Exception as e:
-        print("[ERROR] Failed to send OTP:", repr(e))
+    except Exception:
+        logger.exception("Failed to send OTP")
         raise HTTPException(
             status_code=500,
             detail="Failed to send OTP. Please check server logs."
@@ -147,10 +147,10 @@ async def verify_otp_registration(
 
 ):
     # Get the latest OTP for this phone
-    otp_record = db.query(OTP).filter(
+    otp_record = (await db.scalars(select(OTP).where(
         OTP.verification_id == verification_id,
         OTP.is_used == False
-    ).order_by(OTP.id.desc()).first()
+    ).order_by(OTP.id.desc()))).first()
 
     if not otp_record:
         raise HTTPException(
@@ -159,16 +159,16 @@ async def verify_otp_registration(
     if otp_record.expires_at < datetime.utcnow():
         raise HTTPException(status_code=400, detail="OTP has expired.")
 
-    if not verify_otp_hash(otp_code, otp_record.otp_hashed):
+    if not await verify_otp_hash(otp_code, otp_record.otp_hashed):
         otp_record.attempts += 1
-        db.commit()
+        await db.commit()
         raise HTTPException(status_code=400, detail="Invalid OTP.")
 
     # Mark OTP as used
     otp_record.is_used = True
-    pending_user = db.query(PendingUser).filter(
+    pending_user = (await db.scalars(select(PendingUser).where(
         PendingUser.phone_number == otp_record.phone
-    ).first()
+    ))).first()
 
     if not pending_user:
         raise HTTPException(
@@ -189,9 +189,9 @@ async def verify_otp_registration(
     )
 
     db.add(new_user)
-    db.delete(pending_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.delete(pending_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     return {"message": "User created successfully", "user_id": new_user.id}
 
@@ -205,7 +205,7 @@ async def login_in_token(
     # form_data: OAuth2PasswordRequestForm = Depends(),
 
 ):
-    user = authenticate_user(data.email, data.password, db)
+    user = await authenticate_user(data.email, data.password, db)
     # user = authenticate_user(form_data.username, form_data.password, db)
     if not user:
         raise HTTPException(
@@ -227,39 +227,40 @@ async def login_in_token(
 
 @router.post("/forgot_password", status_code=status.HTTP_200_OK)
 async def forgot_password(data: ForgotPasswordRequest, db: db_dependency):
-    user = db.query(Users).filter(Users.email == data.email).first()
+    user = (await db.scalars(select(Users).where(Users.email == data.email))).first()
     if not user:
        return {"message": "If the email exists, a reset link has been sent."}
    
    
     #delete existing tokens
-    db.query(PasswordResetToken).filter(PasswordResetToken.user_id == user.id ).delete()
+    await db.execute(delete(PasswordResetToken).where(PasswordResetToken.user_id == user.id))
 
     token = str(uuid.uuid4())
     reset_token = PasswordResetToken(
         user_id=user.id, token=token, expires_at=datetime.utcnow() + timedelta(minutes=5))
     db.add(reset_token)
-    db.commit()
     RESET_PASSWORD_URL = (
         f"https://fertipath.onrender.com/#/reset_password?token={token}"
     )
-    send_password_reset_email(
-        to_email=user.email, reset_link=RESET_PASSWORD_URL)
+    queue_password_reset_email(
+        db, to_email=user.email, reset_link=RESET_PASSWORD_URL)
+    await db.commit()
+    email_worker.wake()
     return {"message": "Password reset email sent successfully."}
 
 
 @router.post("/reset_password", status_code=status.HTTP_200_OK)
-def reset_password(data: ResetPasswordRequest, db: db_dependency):
-    reset_record = db.query(PasswordResetToken).filter(
+async def reset_password(data: ResetPasswordRequest, db: db_dependency):
+    reset_record = (await db.scalars(select(PasswordResetToken).where(
         PasswordResetToken.token == data.token,
         PasswordResetToken.expires_at > datetime.now(timezone.utc)
-    ).first()
+    ))).first()
 
     if not reset_record:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired token")
 
-    user = db.query(Users).filter(Users.id == reset_record.user_id).first()
+    user = await db.get(Users, reset_record.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found!")
@@ -267,9 +268,9 @@ def reset_password(data: ResetPasswordRequest, db: db_dependency):
     if len(data.new_password) < 8:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password must be 8 characters long")
 
-    user.hashed_password = bcrypt_context.hash(data.new_password)
-    db.delete(reset_record)
-    db.commit()
+    user.hashed_password = await password_hasher.hash(data.new_password)
+    await db.delete(reset_record)
+    await db.commit()
 
     return {"message": "Password has been reset successfully"}
 
@@ -1,14 +1,20 @@
 from datetime import datetime, timedelta, date
 from datetime import datetime, timedelta
-from typing import Annotated, List
-from fastapi import APIRouter, Depends, HTTPException, Path
-from sqlalchemy.orm import Session
+from typing import Annotated, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
+from pydantic import TypeAdapter
 from starlette import status
-from models import Cycles
-from database import SessionLocal
-from schemas import CycleRequest, UpdateUserProfileRequest, UserProfileResponse, CycleResponse
+from models import Cycles, CycleStats
+from database import db_dependency
+from schemas import CalendarResponse, CycleForecast, CyclePage, CycleRequest, UpdateUserProfileRequest, UserProfileResponse, CycleResponse
 from passlib.context import CryptContext
-from utils.predictions import simple_fertility_ai
+from services.cycle_history import cycle_page, cycle_summary, record_cycle
+from services.response_cache import response_cache
+from utils.cycle_calendar import (
+    DAY_STATES, calendar_etag, month_window, project_day_states, run_length_encode)
+from utils.cycle_estimator import estimate_length, forecast_cycle
+from utils.etags import etag_matches
+from utils.symptoms import SYMPTOMS
 from utils.utils import get_current_user
 
 
@@ -18,64 +24,89 @@ router = APIRouter(
 )
 
 
+user_dependency = Annotated[dict, Depends(get_current_user)]
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
+CYCLE_PAGE_ADAPTER = TypeAdapter(CyclePage)
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
+@router.get("/cycles", status_code=status.HTTP_200_OK, response_model=CyclePage)
+async def get_cycle(
+    request: Request,
+    db: db_dependency,
+    user: user_dependency,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+):
+    """The user's cycle history, newest first."""
+    async def load():
+        cycles_list, next_cursor = await cycle_page(db, user['id'], limit, cursor)
 
+        if not cycles_list and not cursor:
+            raise HTTPException(
+                status_code=404,
+                detail="No cycles found for this user."
+            )
 
-@router.get("/cycles", status_code=status.HTTP_200_OK, response_model=List[CycleResponse])
-async def get_cycle(db:db_dependency, user:user_dependency):
-    cycles_list = db.query(Cycles).filter(Cycles.user_id == user['id']).all()
+        return {"cycles": cycles_list, "next_cursor": next_cursor}, cycles_list
 
-    if not cycles_list:
-        raise HTTPException(
-            status_code=404,
-            detail="No cycles found for this user."
-        )
-      
-    return [
-        {
-            "Cycle_id": cycle.id,
-            "last_period_date": cycle.last_period_date,
-            "Cycle_length": cycle.cycle_length,
-            "Period_length": cycle.period_length
-        }
-        for cycle in cycles_list
-    ]
+    return await response_cache.respond(request, user['id'], "cycles", load, CYCLE_PAGE_ADAPTER)
 
 
 
-@router.post("/cycles", status_code=status.HTTP_200_OK, response_model=dict)
+@router.post("/cycles", status_code=status.HTTP_200_OK, response_model=CycleForecast)
 async def cycles(cycle_data: CycleRequest, db: db_dependency, user: user_dependency ):
+    """Log a period and forecast the next one from the user's history."""
     user_id = user['id']
-    cycle_info = simple_fertility_ai(
-        last_period_date=cycle_data.last_period_date,
-        cycle_length=cycle_data.cycle_length,
-        period_length=cycle_data.period_length,
-        symptoms=cycle_data.symptoms
-    )
 
     cycle = Cycles(
            user_id=user_id,
            last_period_date=cycle_data.last_period_date,
            cycle_length=cycle_data.cycle_length,
            period_length=cycle_data.period_length,
-           symptoms=cycle_data.symptoms
-
+           symptoms=cycle_data.symptoms,
+           symptom_mask=SYMPTOMS.encode(cycle_data.symptoms)
        )
 
     db.add(cycle)
-    db.commit()
-    db.refresh(cycle)
-    return cycle_info
-
+    summary = await record_cycle(db, cycle)
+    await db.commit()
+    response_cache.invalidate(user_id, "cycles")
+    return forecast_cycle(summary, cycle_data.symptoms).to_schema()
+
+
+@router.get("/calendar", status_code=status.HTTP_200_OK, response_model=CalendarResponse)
+async def get_calendar(
+    request: Request,
+    response: Response,
+    db: db_dependency,
+    user: user_dependency,
+    months: int = Query(3, ge=1, le=12)
+):
+    """Projected period, fertile and ovulation days from the start of this
+    month through `months` months, run-length encoded."""
+    stats = await db.get(CycleStats, user['id'])
+
+    if not stats:
+        raise HTTPException(
+            status_code=404,
+            detail="No cycles found for this user."
+        )
 
+    cycle_length, _ = estimate_length(cycle_summary(stats))
+    cycle_length, period_length = round(cycle_length), round(stats.period_length)
+    start, end = month_window(date.today(), months)
+    etag = calendar_etag(stats.last_period_date, cycle_length, period_length, start, end)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    states = project_day_states(stats.last_period_date, cycle_length, period_length, start, end)
+    response.headers.update(headers)
+    return {
+        "start": start,
+        "end": end,
+        "cycle_length": cycle_length,
+        "period_length": period_length,
+        "states": DAY_STATES,
+        "runs": run_length_encode(states)
+    }
@@ -0,0 +1,100 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette import status
+from database import pool_stats
+from services.expiry_sweeper import expiry_sweeper, sweep_once
+from services.insight_precompute import insight_scheduler, precompute_insights
+from services.reply_cache import reply_cache
+from services.request_profiler import PROFILING_ENABLED, profile_token, request_profiler
+from services.response_cache import response_cache
+from services.translator import translation_cache
+from utils.utils import get_current_admin
+
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"]
+)
+
+admin_dependency = Annotated[dict, Depends(get_current_admin)]
+
+
+@router.get("/db-pool", status_code=status.HTTP_200_OK)
+async def db_pool(admin: admin_dependency):
+    return pool_stats()
+
+
+@router.get("/sweeper", status_code=status.HTTP_200_OK)
+async def sweeper_report(admin: admin_dependency):
+    return expiry_sweeper.last_report or {}
+
+
+@router.post("/sweeper/run", status_code=status.HTTP_200_OK)
+async def run_sweeper(admin: admin_dependency):
+    expiry_sweeper.last_report = await sweep_once()
+    return expiry_sweeper.last_report
+
+
+@router.get("/insight-precompute", status_code=status.HTTP_200_OK)
+async def insight_precompute_report(admin: admin_dependency):
+    return insight_scheduler.last_report or {}
+
+
+@router.post("/insight-precompute/run", status_code=status.HTTP_200_OK)
+async def run_insight_precompute(admin: admin_dependency):
+    insight_scheduler.last_report = await precompute_insights(trace_memory=False)
+    return insight_scheduler.last_report
+
+
+@router.get("/reply-cache", status_code=status.HTTP_200_OK)
+async def reply_cache_stats(admin: admin_dependency):
+    return reply_cache.stats()
+
+
+@router.delete("/reply-cache", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_reply_cache(admin: admin_dependency):
+    reply_cache.clear()
+
+
+@router.get("/response-cache", status_code=status.HTTP_200_OK)
+async def response_cache_stats(admin: admin_dependency):
+    return response_cache.stats()
+
+
+@router.delete("/response-cache", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_response_cache(admin: admin_dependency):
+    response_cache.clear()
+
+
+@router.get("/translation-cache", status_code=status.HTTP_200_OK)
+async def translation_cache_stats(admin: admin_dependency):
+    return translation_cache.stats()
+
+
+@router.get("/profiles", status_code=status.HTTP_200_OK)
+async def list_profiles(admin: admin_dependency):
+    return {"enabled": PROFILING_ENABLED, "engine": request_profiler.engine,
+            "profiles": request_profiler.list()}
+
+
+@router.post("/profiles/token", status_code=status.HTTP_201_CREATED)
+async def create_profile_token(admin: admin_dependency, path: str,
+                               ttl_seconds: int = Query(300, ge=1, le=86400)):
+    if not PROFILING_ENABLED or not request_profiler.secret:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="Profiling needs PROFILING_ENABLED=true and PROFILE_SECRET")
+    return {"path": path, "header": "X-Profile-Token",
+            "token": profile_token(path, ttl_seconds, request_profiler.secret)}
+
+
+@router.get("/profiles/{profile_id}", status_code=status.HTTP_200_OK)
+async def get_profile(profile_id: str, admin: admin_dependency):
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return profile
+
+
+@router.delete("/profiles", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_profiles(admin: admin_dependency):
+    request_profiler.clear()
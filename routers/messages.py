@@ -1,9 +1,12 @@
+import json
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import Users
+from fastapi.responses import StreamingResponse
 from utils.utils import get_current_user
+from services.llm_client import llm_client
+from services.reply_cache import cache_key, reply_cache
+from services.translator import translate_text
+from services.user_context import user_context_dependency
 from schemas import MessageRequest, MessageResponse
 
 
@@ -12,49 +15,125 @@ router = APIRouter(
     tags=["chat"]
 )
 
-# ---------------- Database Dependency ----------------
+user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def sse_event(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
+def event_stream(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def reply_cache_key(request: MessageRequest, language: str) -> str | None:
+    """Cache key for this prompt, or None when the reply must not be cached."""
+    if not reply_cache.enabled or request.personalized:
+        return None
+    return cache_key(request.message, language, llm_client.params)
 
 # ---------------- Chat Endpoint ----------------
 
 
 @router.post("/", response_model=MessageResponse, status_code=status.HTTP_200_OK)
-def chat_bot(
+async def chat_bot(
+    request: MessageRequest,
+    db_user: user_context_dependency
+):
+    try:
+        language = db_user.language_preference.value
+
+        async def localized_reply():
+            reply = await llm_client.generate(request.message)
+            # An English fallback is served but not cached
+            return await translate_text(reply, language)
+
+        key = reply_cache_key(request, language)
+        if key is None:
+            reply, _ = await localized_reply()
+        else:
+            reply = await reply_cache.get_or_generate(
+                key, language, request.message, localized_reply)
+        return {"reply": reply}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"AI request failed: {e}"
+        )
+
+
+@router.post("/stream", status_code=status.HTTP_200_OK)
+async def chat_bot_stream(
     request: MessageRequest,
-    db: db_dependency,
-    user: user_dependency
+    db_user: user_context_dependency
 ):
-    # Fetch current user
-    user_id = user["id"]
-    db_user = db.query(Users).filter(Users.id == user_id).first()
-    if not db_user:
-        raise HTTPException(status_code=401, detail="Unauthorized!")
+    """Same as POST /chat/, streamed as server-sent events.
 
+    Each chunk arrives as a `data: {"delta": ...}` event as soon as the
+    model produces it, followed by `event: done` carrying the whole reply.
+    A failure after the stream has started is sent as `event: error`.
+    A cached reply is sent as a single delta.
+
+    Deltas are the model's English output. For other languages the
+    `done` event carries the translated reply, which is what gets cached;
+    if translation fails it carries the English reply, uncached.
+    """
     try:
-        # Generate localized AI reply
-        language = getattr(db_user.language_preference, "value", "en")
-        print(f"Generating chat reply in language: {language}")
-        reply = generate_localized_insight(
-            prompt=request.message,
-            language=language
+        language = db_user.language_preference.value
+        key = reply_cache_key(request, language)
+        cached = await reply_cache.get(key) if key is not None else None
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"AI request failed: {e}"
         )
-        print(f"Reply generated (first 200 chars): {reply[:200]}...")
 
-        return {"reply": reply}
+    if cached is not None:
+        async def cached_events():
+            yield sse_event({"delta": cached})
+            yield sse_event({"reply": cached}, event="done")
+
+        return event_stream(cached_events())
+
+    chunks = llm_client.stream(request.message)
 
+    # Wait for the first chunk here so a busy or failing provider still
+    # gets a proper status code instead of a 200 with an error event.
+    try:
+        first = await anext(chunks, "")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"AI request failed: {e}"
         )
+
+    async def events():
+        reply = [first]
+        try:
+            if first:
+                yield sse_event({"delta": first})
+            async for chunk in chunks:
+                reply.append(chunk)
+                yield sse_event({"delta": chunk})
+            reply, translated = await translate_text("".join(reply), language)
+            if key is not None and translated:
+                await reply_cache.put(key, language, request.message, reply)
+            yield sse_event({"reply": reply}, event="done")
+        except HTTPException as e:
+            yield sse_event({"detail": e.detail}, event="error")
+        except Exception as e:
+            yield sse_event({"detail": f"AI request failed: {e}"}, event="error")
+        finally:
+            await chunks.aclose()
+
+    return event_stream(events())
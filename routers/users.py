@@ -1,11 +1,14 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, Path
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Path, Request
+from pydantic import TypeAdapter
+from sqlalchemy import select
 from starlette import status
 from models import Users, UserProfile
-from database import SessionLocal
-from schemas import UpdateUserProfileRequest, UserProfileResponse, UpdateLangaugeRequest
+from database import db_dependency
+from schemas import UpdateUserProfileRequest, UserProfileResponse, UserResponse, UpdateLangaugeRequest
 from utils.utils import get_current_user
+from services.response_cache import response_cache
+from services.user_context import db_user_dependency, load_current_user, user_context_cache
 from passlib.context import CryptContext
 
 
@@ -19,46 +22,32 @@ router = APIRouter(
 
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
+USER_ADAPTER = TypeAdapter(UserResponse)
+PROFILE_ADAPTER = TypeAdapter(UserProfileResponse)
 
 
-@router.get("/get_user", status_code=status.HTTP_200_OK)
-async def get_user(user: user_dependency, db: db_dependency):
-    if user is None:
-        raise HTTPException(status_code=401, detail="User Not Found!")
-    db_user  = db.query(Users).filter(Users.id == user['id']).first()
-    return {
-        'username': db_user.username,
-        'email': db_user.email,
-        'first_name': db_user.first_name,
-        'last_name': db_user.last_name,
-        'role': db_user.role,
-        'phone_number': db_user.phone_number,
-        'language_preference': db_user.language_preference
-    }
+
+@router.get("/get_user", status_code=status.HTTP_200_OK, response_model=UserResponse)
+async def get_user(request: Request, user: user_dependency, db: db_dependency):
+    async def load():
+        db_user = await db.get(Users, user['id'])
+        if not db_user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="User Not Found!")
+        return db_user, [db_user]
+
+    return await response_cache.respond(request, user['id'], "user", load, USER_ADAPTER)
 
 @router.patch("/update_language_choice", status_code=status.HTTP_200_OK)
-async def update_language_choice(data: UpdateLangaugeRequest, user: user_dependency, db: db_dependency):
-     db_user = db.query(Users).filter(Users.id == user["id"]).first()
-     if not db_user:
-         raise HTTPException(status_code=401, detail="User Not Found!")
-     
+async def update_language_choice(data: UpdateLangaugeRequest, db_user: db_user_dependency, db: db_dependency):
      db_user.language_preference = data.language_preference
-     db.commit()
-     db.refresh(db_user)
+     await db.commit()
+     await db.refresh(db_user)
+     user_context_cache.invalidate(db_user.id)
+     response_cache.invalidate(db_user.id, "user")
      return {
          "message": "Language preference updated successfully",
          "language_preference": db_user.language_preference.value
@@ -70,50 +59,47 @@ async def update_language_choice(data: UpdateLangaugeRequest, user: user_depende
 
 
 @router.delete("/delete_user", status_code=status.HTTP_200_OK)
-async def delete_user(user: user_dependency, db: db_dependency):
-     user_id = user['id']
-     db_user = db.query(Users).filter(Users.id == user_id).first()
-     if not db_user:
-         raise HTTPException(status_code=401, detail="User Not Found!")
-     user_profile = db.query(UserProfile).filter(
-         UserProfile.user_id == user_id).first()
-     if user_profile:
-         db.delete(user_profile)
-     db.delete(db_user)
-     db.commit()
+async def delete_user(
+        db_user: Annotated[Users, Depends(load_current_user("profile", "cycles", "cycle_stats", "insights"))],
+        db: db_dependency):
+     if db_user.profile:
+         await db.delete(db_user.profile)
+     await db.delete(db_user)
+     await db.commit()
+     user_context_cache.invalidate(db_user.id)
+     response_cache.invalidate(db_user.id)
      return {"message": "User deleted"}
 
 
 
 
 @router.get("/profile", status_code=status.HTTP_200_OK, response_model=UserProfileResponse)
-async def get_profile(user: user_dependency, db: db_dependency):
-    profile = db.query(UserProfile).filter(UserProfile.user_id == user['id']).first()
-    if not profile:
-        profile = UserProfile(user_id=user["id"])
-        db.add(profile)
-        db.commit()
-        db.refresh(profile)
-        
-    return profile
+async def get_profile(request: Request, user: user_dependency, db: db_dependency):
+    async def load():
+        profile = (await db.scalars(select(UserProfile).where(UserProfile.user_id == user['id']))).first()
+        if not profile:
+            profile = UserProfile(user_id=user["id"])
+            db.add(profile)
+            await db.commit()
+            await db.refresh(profile)
+        return profile, [profile]
+
+    return await response_cache.respond(request, user['id'], "profile", load, PROFILE_ADAPTER)
         
 
 @router.patch("/profile", status_code=status.HTTP_200_OK, response_model=UserProfileResponse)
 async def update_profile(update_request:UpdateUserProfileRequest, user: user_dependency, db: db_dependency):
-    profile = db.query(UserProfile).filter(UserProfile.user_id == user['id']).first()
+    profile = (await db.scalars(select(UserProfile).where(UserProfile.user_id == user['id']))).first()
     if not profile:
        profile = UserProfile(user_id=user['id'])
        db.add(profile)
-       db.commit()
-       db.refresh(profile)
+       await db.commit()
+       await db.refresh(profile)
     update_data = update_request.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(profile, key, value)
-    db.commit()
-    db.refresh(profile)
+    await db.commit()
+    await db.refresh(profile)
+    user_context_cache.invalidate(user['id'])
+    response_cache.invalidate(user['id'], "profile")
     return profile
-
-
-
-
-
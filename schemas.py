@@ -19,6 +19,18 @@ class CreateUserRequest(BaseModel):
 class UserVerify(BaseModel):
     email: str
 
+class UserResponse(BaseModel):
+    username: str
+    email: str
+    first_name: str
+    last_name: str
+    role: RoleEnum
+    phone_number: str
+    language_preference: LanguageEnum
+
+    class Config:
+        from_attributes = True
+
 class UpdateLangaugeRequest(BaseModel):
     language_preference: Optional[LanguageEnum] = None
 
@@ -69,6 +81,7 @@ class CycleRequest(BaseModel):
 
 
 class CycleResponse(BaseModel):
+    id: int
     last_period_date: date
     cycle_length: int
     period_length: int
@@ -78,16 +91,46 @@ class CycleResponse(BaseModel):
         from_attributes = True
 
 
+class CyclePage(BaseModel):
+    cycles: List[CycleResponse]
+    next_cursor: Optional[str] = None
+
+
 class CyclePrediction(BaseModel):
-    period_start: str
-    period_end: str
+    period_start: date
+    period_end: date
     period_length: int
-    next_period: str
-    ovulation_day: str
-    fertile_window: List[str]
+    next_period: date
+    ovulation_day: date
+    fertile_window: List[date]
     fertility_score: int
 
 
+class CycleForecast(CyclePrediction):
+    cycles_observed: int
+    cycle_length_estimate: float
+    cycle_length_sd: float
+    confidence_level: float
+    next_period_range: List[date]
+    fertile_window_range: List[date]
+
+
+class CalendarResponse(BaseModel):
+    start: date
+    end: date
+    cycle_length: int
+    period_length: int
+    # Names of the day states used in `runs`, indexed by state number
+    states: List[str]
+    # [[state, number of days], ...] covering every day from start to end
+    runs: List[List[int]]
+
+
+class PredictionInsightResponse(BaseModel):
+    predictions: CyclePrediction
+    insight: str
+
+
 class Prediction(BaseModel):
     phase: str
     common_symptoms: list[str]
@@ -116,6 +159,8 @@ class InsightsResponse(BaseModel):
 
 class MessageRequest(BaseModel):
     message: str
+    # Prompts mentioning the user's own data must not be served from the reply cache
+    personalized: bool = False
 
 
 class MessageResponse(BaseModel):
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from jose import jwt, JWTError
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+JWT_KEY_ID = os.getenv("JWT_KEY_ID", "primary")
+# Retired keys still accepted for verification, as "kid:secret,kid:secret"
+JWT_PREVIOUS_KEYS = os.getenv("JWT_PREVIOUS_KEYS", "")
+# Optional JSON file {"algorithm": ..., "current": kid, "keys": {kid: secret}}
+# re-read when it changes, so keys rotate without a restart
+JWT_KEYRING_FILE = os.getenv("JWT_KEYRING_FILE")
+JWT_KEYRING_CHECK_SECONDS = float(os.getenv("JWT_KEYRING_CHECK_SECONDS", 30))
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", 10000))
+
+
+class KeyRing:
+    """Signing key plus every key still accepted for verification."""
+
+    def __init__(self, path: Optional[str] = None, check_interval: float = 30):
+        self.path = path
+        self.check_interval = check_interval
+        self.algorithm = "HS256"
+        self.current_kid = JWT_KEY_ID
+        self.keys: Dict[str, str] = {}
+        self._mtime = None
+        self._next_check = 0.0
+        self._load_env()
+        if self.path:
+            self._load_file()
+
+    def _load_env(self):
+        self.algorithm = os.getenv("ALGORITHM", self.algorithm)
+        secret = os.getenv("SECRET_KEY")
+        if secret:
+            self.keys[self.current_kid] = secret
+        for entry in filter(None, JWT_PREVIOUS_KEYS.split(",")):
+            kid, _, key = entry.partition(":")
+            self.keys.setdefault(kid.strip(), key.strip())
+
+    def _load_file(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        with open(self.path) as f:
+            data = json.load(f)
+        self.algorithm = data.get("algorithm", self.algorithm)
+        self.keys = dict(data["keys"])
+        self.current_kid = data.get("current", self.current_kid)
+        self._mtime = mtime
+        return True
+
+    def refresh(self) -> bool:
+        """Re-read the key ring file if it changed. Returns True on reload."""
+        if not self.path:
+            return False
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.check_interval
+        return self._load_file()
+
+    def sign(self, claims: dict) -> str:
+        return jwt.encode(claims, self.keys[self.current_kid],
+                          algorithm=self.algorithm,
+                          headers={"kid": self.current_kid})
+
+    def decode(self, token: str) -> tuple:
+        """Verify `token` and return (payload, kid).
+
+        Tokens issued before key ids existed carry no kid; those are tried
+        against every key on the ring.
+        """
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid is not None:
+            if kid not in self.keys:
+                raise JWTError("Unknown signing key")
+            return jwt.decode(token, self.keys[kid], algorithms=[self.algorithm]), kid
+        for candidate, key in self.keys.items():
+            try:
+                return jwt.decode(token, key, algorithms=[self.algorithm]), candidate
+            except JWTError:
+                continue
+        raise JWTError("Signature verification failed")
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified token payloads, keyed by the token's digest.
+
+    Entries are only served until the token's own `exp`, so caching never
+    extends a token's lifetime.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes, now: float) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            payload, expires_at, _ = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: bytes, payload: dict, expires_at: float, kid: str):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (payload, expires_at, kid)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def retain_kids(self, kids):
+        """Forget tokens signed with keys that left the ring."""
+        with self._lock:
+            for key in [k for k, (_, _, kid) in self._entries.items() if kid not in kids]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TokenVerifier:
+    def __init__(self, keyring: KeyRing, cache: VerifiedTokenCache):
+        self.keyring = keyring
+        self.cache = cache
+
+    def sign(self, claims: dict) -> str:
+        self._refresh()
+        return self.keyring.sign(claims)
+
+    def verify(self, token: str) -> dict:
+        """Return the token's claims, or raise JWTError."""
+        self._refresh()
+        now = time.time()
+        key = self.cache.digest(token)
+        payload = self.cache.get(key, now)
+        if payload is not None:
+            return payload
+        payload, kid = self.keyring.decode(token)
+        expires_at = payload.get("exp")
+        if expires_at is not None:
+            self.cache.put(key, payload, float(expires_at), kid)
+        return payload
+
+    def _refresh(self):
+        if self.keyring.refresh():
+            self.cache.retain_kids(set(self.keyring.keys))
+
+
+token_verifier = TokenVerifier(
+    KeyRing(JWT_KEYRING_FILE, JWT_KEYRING_CHECK_SECONDS),
+    VerifiedTokenCache(JWT_CACHE_SIZE)
+)
@@ -0,0 +1,107 @@
+import base64
+import os
+from datetime import date
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from database import IS_SQLITE
+from models import Cycles, CycleStats
+from utils.cycle_estimator import CycleSummary, observe_cycle, summarize_cycles
+
+
+# Cycles read back when a summary has to be rebuilt (an older period was logged)
+CYCLE_STATS_REBUILD_CYCLES = int(os.getenv("CYCLE_STATS_REBUILD_CYCLES", 24))
+
+
+# Newest first; id breaks ties between cycles logged for the same date
+NEWEST_FIRST = (Cycles.last_period_date.desc(), Cycles.id.desc())
+
+
+def encode_cursor(cycle: Cycles) -> str:
+    raw = f"{cycle.last_period_date.isoformat()}:{cycle.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        last_period_date, cycle_id = raw.split(":")
+        return date.fromisoformat(last_period_date), int(cycle_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _history(user_id: int):
+    return select(Cycles).where(Cycles.user_id == user_id).order_by(*NEWEST_FIRST)
+
+
+async def recent_cycles(db: AsyncSession, user_id: int, n: int) -> List[Cycles]:
+    """The user's last `n` cycles, newest first, read with one range scan
+    of ix_cycles_user_id_last_period_date."""
+    return list((await db.scalars(_history(user_id).limit(n))).all())
+
+
+async def latest_cycle(db: AsyncSession, user_id: int) -> Optional[Cycles]:
+    cycles = await recent_cycles(db, user_id, 1)
+    return cycles[0] if cycles else None
+
+
+async def cycle_page(db: AsyncSession, user_id: int, limit: int,
+                     cursor: Optional[str] = None) -> Tuple[List[Cycles], Optional[str]]:
+    """One page of the user's history, newest first, and the cursor of the
+    next page (None on the last one).
+
+    Keyset pagination: the cursor is the (last_period_date, id) of the last
+    row served, so every page is an index seek however deep it is.
+    """
+    query = _history(user_id)
+    if cursor:
+        before_date, before_id = decode_cursor(cursor)
+        query = query.where(or_(
+            Cycles.last_period_date < before_date,
+            and_(Cycles.last_period_date == before_date, Cycles.id < before_id)
+        ))
+    cycles = list((await db.scalars(query.limit(limit + 1))).all())
+    next_cursor = encode_cursor(cycles[limit - 1]) if len(cycles) > limit else None
+    return cycles[:limit], next_cursor
+
+
+def cycle_summary(stats: CycleStats) -> CycleSummary:
+    return CycleSummary(*(getattr(stats, field) for field in CycleSummary._fields))
+
+
+async def record_cycle(db: AsyncSession, cycle: Cycles) -> CycleSummary:
+    """Fold a newly added cycle into the user's cycle_stats row; the caller
+    commits. O(1), unless the cycle predates the latest one logged."""
+    stats = await db.get(CycleStats, cycle.user_id, with_for_update=True)
+    if stats is None:
+        # A first cycle. FOR UPDATE above had no row to lock, so a concurrent
+        # first post may be creating it too: whoever inserts first wins and
+        # the other folds its cycle into that row below.
+        summary = observe_cycle(None, cycle.last_period_date, cycle.cycle_length, cycle.period_length)
+        insert = sqlite_insert if IS_SQLITE else pg_insert
+        result = await db.execute(
+            insert(CycleStats)
+            .values(user_id=cycle.user_id, **summary._asdict())
+            .on_conflict_do_nothing(index_elements=[CycleStats.user_id])
+        )
+        if result.rowcount == 1:
+            return summary
+        stats = await db.get(CycleStats, cycle.user_id, with_for_update=True, populate_existing=True)
+
+    summary = observe_cycle(cycle_summary(stats), cycle.last_period_date,
+                            cycle.cycle_length, cycle.period_length)
+    if summary is None:
+        await db.flush()
+        history = await recent_cycles(db, cycle.user_id, CYCLE_STATS_REBUILD_CYCLES)
+        summary = summarize_cycles(
+            (c.last_period_date, c.cycle_length, c.period_length) for c in reversed(history))
+    for field, value in summary._asdict().items():
+        setattr(stats, field, value)
+    return summary
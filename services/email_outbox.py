@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import os
+import smtplib
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from itertools import groupby
+from typing import Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+from database import dispose_engines, session_scope
+from models import EmailOutbox
+from utils.instrumentation import observe_outbound
+from utils.logging_config import configure_logging
+
+
+load_dotenv()
+
+SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
+SENDGRID_SENDER_EMAIL = os.getenv("SENDGRID_SENDER_EMAIL")
+SENDGRID_SENDER_NAME = os.getenv("SENDGRID_SENDER_NAME")
+SENDGRID_API_URL = os.getenv("SENDGRID_API_URL", "https://api.sendgrid.com/v3/mail/send")
+
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "sendgrid")
+EMAIL_WORKER_ENABLED = os.getenv("EMAIL_WORKER_ENABLED", "true").lower() == "true"
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", 50))
+EMAIL_POLL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", 5))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 6))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", 5))
+# How long a claimed row stays invisible to other workers before it is retried
+EMAIL_CLAIM_SECONDS = float(os.getenv("EMAIL_CLAIM_SECONDS", 300))
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 1025))
+
+PENDING, SENDING, SENT, FAILED = "pending", "sending", "sent", "failed"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OutgoingEmail:
+    id: int
+    to_email: str
+    subject: str
+    html_content: str
+
+
+class PermanentDeliveryError(Exception):
+    """The provider rejected the message; retrying will not help."""
+
+
+class EmailTransport(ABC):
+    """Delivers a batch of emails and reports the outcome of each one.
+
+    `send_batch` returns {email id: error}, with None for every message
+    that was accepted.
+    """
+
+    @abstractmethod
+    async def send_batch(self, emails: List[OutgoingEmail]) -> Dict[int, Optional[Exception]]:
+        ...
+
+    async def close(self):
+        pass
+
+
+class SendGridTransport(EmailTransport):
+    """SendGrid v3 over one pooled HTTP client.
+
+    Messages with identical subject and body go out in a single request,
+    one personalization per recipient. Everything else is sent concurrently
+    over the same connection pool.
+    """
+
+    def __init__(self, api_key: str, sender_email: str, sender_name: Optional[str],
+                 url: str = SENDGRID_API_URL, max_recipients: int = 1000):
+        if not api_key or not sender_email:
+            raise ValueError("SendGrid environment variables not set correctly.")
+        self.url = url
+        self.sender = {"email": sender_email, "name": sender_name} if sender_name else {"email": sender_email}
+        self.max_recipients = max_recipients
+        self.client = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10)
+        )
+
+    async def _post(self, group: List[OutgoingEmail]) -> Optional[Exception]:
+        payload = {
+            "from": self.sender,
+            "subject": group[0].subject,
+            "content": [{"type": "text/html", "value": group[0].html_content}],
+            "personalizations": [{"to": [{"email": email.to_email}]} for email in group],
+        }
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(self.url, json=payload)
+        except httpx.HTTPError as e:
+            observe_outbound("sendgrid", time.perf_counter() - started, "error")
+            return e
+        observe_outbound("sendgrid", time.perf_counter() - started, str(response.status_code))
+        if response.status_code in (200, 202):
+            return None
+        error = f"SendGrid returned {response.status_code}: {response.text[:500]}"
+        if 400 <= response.status_code < 500 and response.status_code != 429:
+            return PermanentDeliveryError(error)
+        return Exception(error)
+
+    async def send_batch(self, emails):
+        def content_key(email):
+            return (email.subject, email.html_content)
+
+        groups = []
+        for _, same_content in groupby(sorted(emails, key=content_key), key=content_key):
+            same_content = list(same_content)
+            for i in range(0, len(same_content), self.max_recipients):
+                groups.append(same_content[i:i + self.max_recipients])
+
+        errors = await asyncio.gather(*(self._post(group) for group in groups))
+        return {email.id: error for group, error in zip(groups, errors) for email in group}
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class SMTPTransport(EmailTransport):
+    """Plain SMTP, e.g. a local MailHog or aiosmtpd sink during development."""
+
+    def __init__(self, host: str, port: int, sender_email: str):
+        self.host = host
+        self.port = port
+        self.sender_email = sender_email or "noreply@localhost"
+
+    def _send_all(self, emails):
+        results = {}
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            for email in emails:
+                message = EmailMessage()
+                message["From"] = self.sender_email
+                message["To"] = email.to_email
+                message["Subject"] = email.subject
+                message.set_content(email.html_content, subtype="html")
+                try:
+                    smtp.send_message(message)
+                    results[email.id] = None
+                except smtplib.SMTPException as e:
+                    results[email.id] = e
+        return results
+
+    async def send_batch(self, emails):
+        try:
+            return await asyncio.to_thread(self._send_all, emails)
+        except OSError as e:
+            return {email.id: e for email in emails}
+
+
+class MemoryTransport(EmailTransport):
+    """Keeps delivered messages in memory. For tests and benchmarks."""
+
+    def __init__(self):
+        self.outbox: List[OutgoingEmail] = []
+
+    async def send_batch(self, emails):
+        self.outbox.extend(emails)
+        return {email.id: None for email in emails}
+
+
+def build_transport(name: str = EMAIL_TRANSPORT) -> EmailTransport:
+    if name == "sendgrid":
+        return SendGridTransport(SENDGRID_API_KEY, SENDGRID_SENDER_EMAIL, SENDGRID_SENDER_NAME)
+    if name == "smtp":
+        return SMTPTransport(SMTP_HOST, SMTP_PORT, SENDGRID_SENDER_EMAIL)
+    if name == "memory":
+        return MemoryTransport()
+    raise ValueError(f"Unknown EMAIL_TRANSPORT: {name}")
+
+
+def queue_email(db, to_email: str, subject: str, html_content: str) -> EmailOutbox:
+    """Add an email to the outbox. It is sent once the caller commits."""
+    if "@" not in to_email:
+        raise ValueError(f"Invalid recipient email: {to_email}")
+    email = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        html_content=html_content,
+        status=PENDING,
+        attempts=0,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.add(email)
+    return email
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+class EmailOutboxWorker:
+    """Drains the email outbox in the background.
+
+    Rows are claimed by pushing `next_attempt_at` past the claim window, so
+    a row held by a crashed worker becomes due again on its own. On
+    Postgres the claim also uses SKIP LOCKED, so several app processes can
+    share one outbox.
+    """
+
+    def __init__(self, transport_factory=build_transport, batch_size: int = EMAIL_BATCH_SIZE,
+                 poll_seconds: float = EMAIL_POLL_SECONDS):
+        self.transport_factory = transport_factory
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.transport: Optional[EmailTransport] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def wake(self):
+        """Tell the worker new rows were committed."""
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name="email-outbox")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.transport is not None:
+            await self.transport.close()
+            self.transport = None
+
+    async def run(self):
+        # Built here rather than in start() so missing provider settings
+        # can't stop the app from booting; the rows just wait
+        try:
+            self.transport = self.transport_factory()
+        except ValueError:
+            logger.exception("Email transport is not configured; outbox rows stay pending")
+            return
+        while True:
+            try:
+                delivered = await self.deliver_due()
+            except Exception:
+                logger.exception("Email outbox run failed")
+                delivered = 0
+            if delivered < self.batch_size:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _claim(self, db) -> List[OutgoingEmail]:
+        now = datetime.utcnow()
+        rows = (await db.scalars(
+            select(EmailOutbox)
+            .where(EmailOutbox.status.in_((PENDING, SENDING)),
+                   EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )).all()
+        lease_until = now + timedelta(seconds=EMAIL_CLAIM_SECONDS)
+        for row in rows:
+            row.status = SENDING
+            row.next_attempt_at = lease_until
+        await db.commit()
+        return [OutgoingEmail(row.id, row.to_email, row.subject, row.html_content)
+                for row in rows]
+
+    async def deliver_due(self) -> int:
+        """Send one batch of due emails. Returns how many were claimed."""
+        async with session_scope() as db:
+            emails = await self._claim(db)
+            if not emails:
+                return 0
+
+            results = await self.transport.send_batch(emails)
+
+            now = datetime.utcnow()
+            rows = (await db.scalars(
+                select(EmailOutbox).where(EmailOutbox.id.in_(list(results)))
+            )).all()
+            for row in rows:
+                error = results[row.id]
+                row.attempts += 1
+                if error is None:
+                    row.status = SENT
+                    row.sent_at = now
+                    row.last_error = None
+                elif isinstance(error, PermanentDeliveryError) or row.attempts >= EMAIL_MAX_ATTEMPTS:
+                    row.status = FAILED
+                    row.last_error = repr(error)
+                else:
+                    row.status = PENDING
+                    row.next_attempt_at = now + retry_delay(row.attempts)
+                    row.last_error = repr(error)
+            await db.commit()
+            return len(emails)
+
+
+email_worker = EmailOutboxWorker()
+
+
+async def _run_forever():
+    email_worker.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await email_worker.stop()
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    # Run the worker as its own process (set EMAIL_WORKER_ENABLED=false on the web app)
+    configure_logging()
+    asyncio.run(_run_forever())
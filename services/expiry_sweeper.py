@@ -0,0 +1,110 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+
+from database import dispose_engines, session_scope
+from models import OTP, ChatReplyCache, EmailOutbox, PasswordResetToken, PendingUser
+from utils.logging_config import configure_logging
+
+
+SWEEPER_ENABLED = os.getenv("SWEEPER_ENABLED", "true").lower() == "true"
+SWEEP_INTERVAL_SECONDS = float(os.getenv("SWEEP_INTERVAL_SECONDS", 900))
+SWEEP_BATCH_SIZE = int(os.getenv("SWEEP_BATCH_SIZE", 500))
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", 7))
+
+logger = logging.getLogger(__name__)
+
+
+def _expired_targets(now: datetime):
+    """(table name, model, condition selecting rows that are safe to delete)"""
+    outbox_cutoff = now - timedelta(days=EMAIL_OUTBOX_RETENTION_DAYS)
+    return [
+        ("otp", OTP, OTP.expires_at < now),
+        ("pending_users", PendingUser, PendingUser.expires_at < now),
+        ("password_reset_token", PasswordResetToken, PasswordResetToken.expires_at < now),
+        ("chat_reply_cache", ChatReplyCache, ChatReplyCache.expires_at < now),
+        ("email_outbox", EmailOutbox,
+         EmailOutbox.status.in_(("sent", "failed")) & (EmailOutbox.created_at < outbox_cutoff)),
+    ]
+
+
+async def _purge(db, model, condition, batch_size: int) -> int:
+    purged = 0
+    while True:
+        ids = (await db.scalars(
+            select(model.id).where(condition).limit(batch_size)
+        )).all()
+        if not ids:
+            return purged
+        await db.execute(delete(model).where(model.id.in_(ids)))
+        await db.commit()
+        purged += len(ids)
+        if len(ids) < batch_size:
+            return purged
+        # Let request handlers in between batches
+        await asyncio.sleep(0)
+
+
+async def sweep_once(batch_size: int = SWEEP_BATCH_SIZE) -> dict:
+    """Delete expired rows in bounded batches and report what is left."""
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    report = {"ran_at": now.isoformat(), "tables": {}}
+    async with session_scope() as db:
+        for table, model, condition in _expired_targets(now):
+            purged = await _purge(db, model, condition, batch_size)
+            remaining = await db.scalar(select(func.count()).select_from(model))
+            report["tables"][table] = {"purged": purged, "rows": remaining}
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+class ExpirySweeper:
+    def __init__(self, interval: float = SWEEP_INTERVAL_SECONDS):
+        self.interval = interval
+        self.last_report: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name="expiry-sweeper")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        while True:
+            try:
+                self.last_report = await sweep_once()
+                logger.info("Expiry sweep finished", extra={"report": self.last_report})
+            except Exception:
+                logger.exception("Expiry sweep failed")
+            await asyncio.sleep(self.interval)
+
+
+expiry_sweeper = ExpirySweeper()
+
+
+async def _main():
+    try:
+        print(json.dumps(await sweep_once(), indent=2))
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    # One-off sweep, e.g. from a cron job
+    configure_logging()
+    asyncio.run(_main())
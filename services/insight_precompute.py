@@ -0,0 +1,220 @@
+"""Nightly precomputation of every user's insight.
+
+Streams the cycle_stats summary of every user that has logged a cycle,
+with the symptoms and mask of their latest cycle, in keyset-paginated chunks,
+runs the batch prediction engine over each chunk at the estimated cycle
+length, picks and translates the day's insight and bulk-upserts the
+`insights` table, so the read path (`GET /insights/insights`) is a
+single indexed lookup.
+
+Run once (e.g. from cron):
+
+    python -m services.insight_precompute [--date YYYY-MM-DD] [--chunk-size N]
+
+or let the app schedule it by setting INSIGHT_PRECOMPUTE_ENABLED=true.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import IS_SQLITE, dispose_engines, session_scope
+from models import Cycles, CycleStats, Insights, Users
+from services.cycle_history import NEWEST_FIRST
+from services.insights_engine import generate_insight_keys
+from services.response_cache import response_cache
+from services.translator import translate_insight
+from utils.batch_predictions import predict_batch
+from utils.cycle_estimator import expected_length
+from utils.logging_config import configure_logging
+
+
+INSIGHT_PRECOMPUTE_ENABLED = os.getenv("INSIGHT_PRECOMPUTE_ENABLED", "false").lower() == "true"
+# UTC hour at which the in-process scheduler runs the job
+INSIGHT_PRECOMPUTE_HOUR = int(os.getenv("INSIGHT_PRECOMPUTE_HOUR", 1))
+INSIGHT_PRECOMPUTE_CHUNK_SIZE = int(os.getenv("INSIGHT_PRECOMPUTE_CHUNK_SIZE", 500))
+
+logger = logging.getLogger(__name__)
+
+
+def _upsert_statement(rows: list):
+    insert = sqlite_insert if IS_SQLITE else pg_insert
+    stmt = insert(Insights).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[Insights.user_id],
+        set_={
+            **{column: stmt.excluded[column]
+               for column in ("next_period", "ovulation_day", "fertile_period_start",
+                              "fertile_period_end", "symptoms", "symptom_mask", "insight_text")},
+            # Core statements skip the ORM's version counter, so bump it here
+            "version_id": Insights.version_id + 1,
+        }
+    )
+
+
+def build_insight_rows(chunk: list, today: date) -> list:
+    """Turn (user_id, last_period_date, cycle_length, period_length,
+    symptom_mask, symptoms, language) tuples into `insights` rows."""
+    masks = np.array([row[4] or 0 for row in chunk], dtype=np.int64)
+    prediction = predict_batch(
+        [row[1] for row in chunk],
+        [row[2] or 0 for row in chunk],
+        [row[3] or 0 for row in chunk],
+        masks
+    )
+    next_period = prediction.next_period.astype(object)
+    ovulation = prediction.ovulation_day.astype(object)
+    fertile_start = prediction.fertile_start.astype(object)
+    fertile_end = prediction.fertile_end.astype(object)
+    keys = generate_insight_keys(today, prediction.ovulation_day, prediction.fertility_score)
+
+    texts = {}
+    rows = []
+    for i, (user_id, _, _, _, mask, symptoms, language) in enumerate(chunk):
+        key = keys[i]
+        lang = getattr(language, "value", language) or "en"
+        if (key, lang) not in texts:
+            texts[key, lang] = translate_insight(key=key, language=lang)
+        rows.append({
+            "user_id": user_id,
+            "next_period": next_period[i],
+            "ovulation_day": ovulation[i],
+            "fertile_period_start": fertile_start[i],
+            "fertile_period_end": fertile_end[i],
+            # The list as logged, free-form entries included; the mask only
+            # holds the registry's names
+            "symptoms": symptoms or [],
+            "symptom_mask": mask or 0,
+            "insight_text": texts[key, lang],
+        })
+    return rows
+
+
+async def precompute_insights(today: Optional[date] = None,
+                              chunk_size: int = INSIGHT_PRECOMPUTE_CHUNK_SIZE,
+                              trace_memory: bool = True) -> dict:
+    """Recompute and upsert the insight of every user with a cycle."""
+    today = today or date.today()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    processed, last_id = 0, 0
+    # Symptoms of each user's newest cycle: one seek on ix_cycles_user_id_last_period_date
+    latest_cycle_id = (
+        select(Cycles.id)
+        .where(Cycles.user_id == CycleStats.user_id)
+        .order_by(*NEWEST_FIRST)
+        .limit(1)
+        .correlate(CycleStats)
+        .scalar_subquery()
+    )
+    try:
+        async with session_scope() as db:
+            while True:
+                result = await db.execute(
+                    select(CycleStats.user_id, CycleStats.last_period_date,
+                           CycleStats.cycles_observed, CycleStats.mean_length,
+                           CycleStats.reported_length, CycleStats.period_length,
+                           Cycles.symptom_mask, Cycles.symptoms, Users.language_preference)
+                    .join(Users, Users.id == CycleStats.user_id)
+                    .join(Cycles, Cycles.id == latest_cycle_id)
+                    .where(CycleStats.user_id > last_id)
+                    .order_by(CycleStats.user_id)
+                    .limit(chunk_size)
+                )
+                chunk = result.all()
+                if not chunk:
+                    break
+                last_id = chunk[-1][0]
+                rows = build_insight_rows([
+                    (user_id, last_period, round(expected_length(observed, mean, reported)),
+                     round(period), mask, symptoms, language)
+                    for user_id, last_period, observed, mean, reported, period, mask, symptoms, language in chunk
+                ], today)
+                await db.execute(_upsert_statement(rows))
+                await db.commit()
+                processed += len(rows)
+        response_cache.invalidate_route("insights")
+        seconds = time.perf_counter() - started
+        report = {
+            "date": today.isoformat(),
+            "rows": processed,
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(processed / seconds, 1) if seconds else None,
+        }
+        if trace_memory:
+            report["peak_memory_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        return report
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+
+class InsightPrecomputeScheduler:
+    """Runs precompute_insights once a day at INSIGHT_PRECOMPUTE_HOUR (UTC)."""
+
+    def __init__(self, hour: int = INSIGHT_PRECOMPUTE_HOUR):
+        self.hour = hour
+        self.last_report: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def seconds_until_next_run(self, now: Optional[datetime] = None) -> float:
+        now = now or datetime.utcnow()
+        next_run = now.replace(hour=self.hour, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name="insight-precompute")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.seconds_until_next_run())
+            try:
+                self.last_report = await precompute_insights()
+                logger.info("Insight precompute finished", extra={"report": self.last_report})
+            except Exception:
+                logger.exception("Insight precompute failed")
+
+
+insight_scheduler = InsightPrecomputeScheduler()
+
+
+async def _main(args):
+    try:
+        report = await precompute_insights(
+            today=args.date, chunk_size=args.chunk_size, trace_memory=not args.no_trace_memory)
+        print(json.dumps(report, indent=2))
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute today's insight for every user.")
+    parser.add_argument("--date", type=date.fromisoformat, default=None)
+    parser.add_argument("--chunk-size", type=int, default=INSIGHT_PRECOMPUTE_CHUNK_SIZE)
+    parser.add_argument("--no-trace-memory", action="store_true",
+                        help="skip tracemalloc; faster, but no peak memory figure")
+    configure_logging()
+    asyncio.run(_main(parser.parse_args()))
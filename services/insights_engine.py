@@ -1,21 +1,113 @@
+from bisect import bisect_right
 from datetime import date
+from typing import Iterable, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.translations import TRANSLATIONS
+
+
+# Score buckets: below 70 is "low", 70-74 "normal", 75 and up "high"
+# (the threshold HIGH_FERTILITY has always used)
+SCORE_BUCKET_EDGES = (70, 75)
+SCORE_BUCKETS = ("low", "normal", "high")
+
+
+class InsightRule(NamedTuple):
+    """Pick `key` when today is `first`..`last` days after ovulation
+    (negative before it) and the fertility score falls in one of
+    `buckets` (None matches every score)."""
+    key: str
+    first: int
+    last: int
+    buckets: Optional[Tuple[str, ...]] = None
+
+
+# Earlier rules win. The next period is always 14 days after ovulation,
+# and the longest cycle we accept (32 days) ovulates on day 18.
+INSIGHT_RULES = (
+    InsightRule("OVULATION_DAY", 0, 0),
+    InsightRule("FERTILE_WINDOW", -2, 2),
+    InsightRule("POST_OVULATION", 3, 10),
+    InsightRule("PERIOD_EXPECTED", 11, 13),
+    InsightRule("PERIOD_DAY", 14, 14),
+    InsightRule("HIGH_FERTILITY", -18, -3, ("high",)),
+    InsightRule("CYCLE_NORMAL", -18, -3, ("normal",)),
+    InsightRule("LOW_FERTILITY", -18, -3, ("low",)),
+)
+DEFAULT_KEY = "DEFAULT"
+
+
+class InsightRuleTable:
+    """INSIGHT_RULES compiled into an (offset x score bucket) lookup."""
+
+    def __init__(self, rules: Sequence[InsightRule], default: str = DEFAULT_KEY,
+                 edges: Tuple[int, ...] = SCORE_BUCKET_EDGES,
+                 buckets: Tuple[str, ...] = SCORE_BUCKETS):
+        known = set(TRANSLATIONS["en"])
+        unknown = {rule.key for rule in rules if rule.key not in known} - {default}
+        if unknown or default not in known:
+            raise ValueError(f"Insight rules use keys without translations: {unknown or {default}}")
+        if len(buckets) != len(edges) + 1:
+            raise ValueError("Need exactly one more score bucket than bucket edges")
+
+        self.edges = edges
+        self.keys = tuple(dict.fromkeys([default, *(rule.key for rule in rules)]))
+        self.min_offset = min(rule.first for rule in rules)
+        self.max_offset = max(rule.last for rule in rules)
+
+        index = {key: i for i, key in enumerate(self.keys)}
+        # One extra row at each end catches every offset outside the rules
+        table = np.zeros((self.max_offset - self.min_offset + 3, len(buckets)), dtype=np.int8)
+        filled = np.zeros(table.shape, dtype=bool)
+        for rule in rules:
+            columns = [buckets.index(b) for b in rule.buckets] if rule.buckets else range(len(buckets))
+            for offset in range(rule.first, rule.last + 1):
+                row = offset - self.min_offset + 1
+                for column in columns:
+                    if not filled[row, column]:
+                        table[row, column] = index[rule.key]
+                        filled[row, column] = True
+        self.table = table
+        self.default = default
+        # Per offset, the key for every score 0..100, so a lookup is two indexings
+        self._by_score = [
+            tuple(self.keys[row[bisect_right(edges, score)]] for score in range(101))
+            for row in table[1:-1]
+        ]
+
+    def key_for(self, offset: int, fertility_score: int) -> str:
+        if not self.min_offset <= offset <= self.max_offset:
+            return self.default
+        keys = self._by_score[offset - self.min_offset]
+        # Scores are clamped to 0..100 upstream; clamping here only as a fallback
+        return keys[min(max(fertility_score, 0), 100)]
+
+    def key_indices(self, offsets: np.ndarray, fertility_scores: np.ndarray) -> np.ndarray:
+        rows = np.clip(np.asarray(offsets) - self.min_offset + 1, 0, len(self.table) - 1)
+        columns = np.searchsorted(self.edges, np.asarray(fertility_scores), side="right")
+        return self.table[rows, columns]
+
+
+RULE_TABLE = InsightRuleTable(INSIGHT_RULES)
 
 
 def generate_insight_key(
     *,
     today: date,
     ovulation_day: date,
-    fertile_start: date,
-    fertile_end: date,
     fertility_score: int
 ) -> str:
     """Return a key for translation based on cycle info."""
+    return RULE_TABLE.key_for((today - ovulation_day).days, fertility_score)
 
-    if today == ovulation_day:
-        return "OVULATION_DAY"
-    elif fertile_start <= today <= fertile_end:
-        return "FERTILE_WINDOW"
-    elif fertility_score >= 75:
-        return "HIGH_FERTILITY"
-    else:
-        return "DEFAULT"
+
+def generate_insight_keys(
+    today: date,
+    ovulation_days: Iterable[date] | np.ndarray,
+    fertility_scores: Iterable[int] | np.ndarray
+) -> np.ndarray:
+    """Vectorized `generate_insight_key`; returns an array of key strings."""
+    offsets = (np.datetime64(today, "D") - np.asarray(ovulation_days, dtype="datetime64[D]")).astype(np.int64)
+    keys = np.array(RULE_TABLE.keys, dtype=object)
+    return keys[RULE_TABLE.key_indices(offsets, fertility_scores)]
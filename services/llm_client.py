@@ -0,0 +1,257 @@
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import cohere
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+
+from utils.instrumentation import observe_outbound
+from utils.metrics import Counter, Gauge, Histogram
+
+
+load_dotenv()
+
+COHERE_API_KEY = os.getenv("COHERE_API_KEY")
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "cohere")
+LLM_MODEL = os.getenv("LLM_MODEL", "command-xlarge-nightly")
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", 180))
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", 0.7))
+# Generations allowed in flight per process; the rest wait up to LLM_QUEUE_TIMEOUT_SECONDS
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", 5))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 30))
+LLM_RETRY_AFTER = int(os.getenv("LLM_RETRY_AFTER", 2))
+FAKE_LLM_FIRST_TOKEN_SECONDS = float(os.getenv("FAKE_LLM_FIRST_TOKEN_SECONDS", 0.2))
+FAKE_LLM_TOKEN_SECONDS = float(os.getenv("FAKE_LLM_TOKEN_SECONDS", 0.02))
+
+llm_in_flight = Gauge(
+    "llm_in_flight",
+    "LLM generations currently holding a concurrency slot")
+llm_requests_total = Counter(
+    "llm_requests_total",
+    "LLM generations by outcome", ("provider", "mode", "outcome"))
+llm_first_token_seconds = Histogram(
+    "llm_first_token_seconds",
+    "Time from acquiring a slot to the first streamed chunk", ("provider",))
+llm_latency_seconds = Histogram(
+    "llm_latency_seconds",
+    "Time from acquiring a slot to the end of the generation", ("provider", "mode"))
+
+
+class LLMProvider(ABC):
+    """An async text generator.
+
+    `stream` yields the reply in chunks as the model produces them;
+    `generate` returns the whole reply.
+    """
+
+    name = "base"
+
+    @property
+    def params(self) -> dict:
+        """Everything besides the prompt that shapes the reply."""
+        return {"provider": self.name}
+
+    @abstractmethod
+    def stream(self, prompt: str) -> AsyncIterator[str]:
+        ...
+
+    async def generate(self, prompt: str) -> str:
+        return "".join([chunk async for chunk in self.stream(prompt)])
+
+    async def close(self):
+        pass
+
+
+class CohereProvider(LLMProvider):
+    name = "cohere"
+
+    def __init__(self, api_key: Optional[str], model: str = LLM_MODEL,
+                 max_tokens: int = LLM_MAX_TOKENS, temperature: float = LLM_TEMPERATURE,
+                 timeout: float = LLM_TIMEOUT_SECONDS):
+        if not api_key:
+            raise ValueError("COHERE_API_KEY is not set in your environment!")
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.client = cohere.AsyncClient(api_key, timeout=timeout, check_api_key=False)
+
+    @property
+    def params(self) -> dict:
+        return {"provider": self.name, "model": self.model,
+                "max_tokens": self.max_tokens, "temperature": self.temperature}
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.client.chat(
+            message=prompt,
+            model=self.model,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature
+        )
+        return response.text
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.client.chat(
+            message=prompt,
+            model=self.model,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            stream=True
+        )
+        async for event in response:
+            if event.event_type == "text-generation" and event.text:
+                yield event.text
+
+    async def close(self):
+        await self.client.close()
+
+
+class FakeProvider(LLMProvider):
+    """Offline stand-in that streams a canned reply at a steady token rate.
+
+    The reply is derived from the prompt, so it is deterministic. For local
+    development and load tests.
+    """
+
+    name = "fake"
+
+    def __init__(self, first_token_seconds: float = FAKE_LLM_FIRST_TOKEN_SECONDS,
+                 token_seconds: float = FAKE_LLM_TOKEN_SECONDS):
+        self.first_token_seconds = first_token_seconds
+        self.token_seconds = token_seconds
+
+    def reply_for(self, prompt: str) -> str:
+        return (f"Thanks for your question about \"{prompt.strip()[:80]}\". "
+                "Tracking your cycle regularly helps spot your fertile days, "
+                "and a doctor can advise on anything that worries you.")
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        await asyncio.sleep(self.first_token_seconds)
+        words = self.reply_for(prompt).split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.token_seconds)
+            yield word if i == len(words) - 1 else word + " "
+
+
+def build_provider(name: str = LLM_PROVIDER) -> LLMProvider:
+    if name == "cohere":
+        return CohereProvider(COHERE_API_KEY)
+    if name == "fake":
+        return FakeProvider()
+    raise ValueError(f"Unknown LLM_PROVIDER: {name}")
+
+
+class LLMClient:
+    """Bounds and times every call to the LLM provider.
+
+    At most `max_concurrency` generations run at once in this process.
+    Callers wait up to `queue_timeout` for a slot and then get a 503 with
+    Retry-After. A generation that runs past `timeout` gets a 504, which
+    for a stream may arrive after some chunks have already been sent.
+    """
+
+    def __init__(self, provider_factory=build_provider, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS,
+                 timeout: float = LLM_TIMEOUT_SECONDS, retry_after: int = LLM_RETRY_AFTER):
+        self.provider_factory = provider_factory
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._provider: Optional[LLMProvider] = None
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+
+    @property
+    def provider(self) -> LLMProvider:
+        # Created on first use, inside the running event loop
+        if self._provider is None:
+            self._provider = self.provider_factory()
+        return self._provider
+
+    @property
+    def params(self) -> dict:
+        return self.provider.params
+
+    @asynccontextmanager
+    async def _slot(self, mode: str):
+        provider = self.provider
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            llm_requests_total.inc(provider=provider.name, mode=mode, outcome="rejected")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The assistant is busy, please try again shortly.",
+                headers={"Retry-After": str(self.retry_after)}
+            )
+        self._in_flight += 1
+        llm_in_flight.set(self._in_flight)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            yield provider
+            outcome = "ok"
+        except HTTPException:
+            outcome = "timeout"
+            raise
+        except (GeneratorExit, asyncio.CancelledError):
+            outcome = "cancelled"
+            raise
+        finally:
+            self._in_flight -= 1
+            llm_in_flight.set(self._in_flight)
+            self._slots.release()
+            elapsed = time.perf_counter() - started
+            llm_latency_seconds.observe(elapsed, provider=provider.name, mode=mode)
+            observe_outbound(provider.name, elapsed, outcome)
+            llm_requests_total.inc(provider=provider.name, mode=mode, outcome=outcome)
+
+    def _timed_out(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="The assistant took too long to answer."
+        )
+
+    async def generate(self, prompt: str) -> str:
+        async with self._slot("generate") as provider:
+            try:
+                return await asyncio.wait_for(provider.generate(prompt), self.timeout)
+            except asyncio.TimeoutError:
+                raise self._timed_out()
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        async with self._slot("stream") as provider:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            deadline = started + self.timeout
+            chunks = provider.stream(prompt)
+            first = True
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(
+                            chunks.__anext__(), max(deadline - loop.time(), 0))
+                    except StopAsyncIteration:
+                        return
+                    except asyncio.TimeoutError:
+                        raise self._timed_out()
+                    if first:
+                        llm_first_token_seconds.observe(loop.time() - started, provider=provider.name)
+                        first = False
+                    yield chunk
+            finally:
+                await chunks.aclose()
+
+    async def close(self):
+        if self._provider is not None:
+            await self._provider.close()
+            self._provider = None
+
+
+llm_client = LLMClient()
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from utils.instrumentation import phase_timer
+from utils.metrics import Counter, Gauge, Histogram
+
+
+PASSWORD_HASHER_WORKERS = int(os.getenv("PASSWORD_HASHER_WORKERS", 2))
+PASSWORD_HASHER_MAX_QUEUE = int(os.getenv("PASSWORD_HASHER_MAX_QUEUE", 32))
+PASSWORD_HASHER_RETRY_AFTER = int(os.getenv("PASSWORD_HASHER_RETRY_AFTER", 2))
+
+bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+
+hasher_queue_depth = Gauge(
+    "password_hasher_queue_depth",
+    "bcrypt jobs submitted to the executor and not yet finished")
+hasher_wait_seconds = Histogram(
+    "password_hasher_wait_seconds",
+    "Time a bcrypt job waited for a free worker", ("op",))
+hasher_latency_seconds = Histogram(
+    "password_hasher_latency_seconds",
+    "Time spent inside bcrypt", ("op",))
+hasher_rejected_total = Counter(
+    "password_hasher_rejected_total",
+    "bcrypt jobs refused because the queue was full", ("op",))
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool so it never blocks the event loop.
+
+    bcrypt releases the GIL while hashing, so a small thread pool gives real
+    parallelism. Once `workers + max_queue` jobs are in flight new requests
+    get a 503 with Retry-After instead of piling up behind a login burst.
+    """
+
+    def __init__(self, context: CryptContext, workers: int, max_queue: int, retry_after: int):
+        self.context = context
+        self.retry_after = retry_after
+        self._max_pending = workers + max_queue
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hasher")
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending
+
+    async def _run(self, op: str, fn, *args):
+        if self._pending >= self._max_pending:
+            hasher_rejected_total.inc(op=op)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again shortly.",
+                headers={"Retry-After": str(self.retry_after)}
+            )
+
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            hasher_wait_seconds.observe(started - submitted, op=op)
+            try:
+                return fn(*args)
+            finally:
+                hasher_latency_seconds.observe(
+                    time.perf_counter() - started, op=op)
+
+        self._pending += 1
+        hasher_queue_depth.set(self._pending)
+        try:
+            loop = asyncio.get_running_loop()
+            # Queue wait included: the request is blocked on bcrypt either way
+            with phase_timer("bcrypt"):
+                return await loop.run_in_executor(self._executor, timed)
+        finally:
+            self._pending -= 1
+            hasher_queue_depth.set(self._pending)
+
+    async def hash(self, secret: str) -> str:
+        return await self._run("hash", self.context.hash, secret)
+
+    async def verify(self, secret: str, hashed: str) -> bool:
+        return await self._run("verify", self.context.verify, secret, hashed)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher(
+    bcrypt_context,
+    workers=PASSWORD_HASHER_WORKERS,
+    max_queue=PASSWORD_HASHER_MAX_QUEUE,
+    retry_after=PASSWORD_HASHER_RETRY_AFTER
+)
@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import IS_SQLITE, session_scope
+from models import ChatReplyCache
+from utils.metrics import Counter, Gauge
+
+
+CHAT_REPLY_CACHE_ENABLED = os.getenv("CHAT_REPLY_CACHE_ENABLED", "true").lower() == "true"
+CHAT_REPLY_CACHE_SIZE = int(os.getenv("CHAT_REPLY_CACHE_SIZE", 1000))
+CHAT_REPLY_CACHE_TTL = float(os.getenv("CHAT_REPLY_CACHE_TTL", 86400))
+# Also keep replies in the chat_reply_cache table, shared by every process
+CHAT_REPLY_CACHE_PERSIST = os.getenv("CHAT_REPLY_CACHE_PERSIST", "false").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+reply_cache_hits_total = Counter(
+    "chat_reply_cache_hits_total",
+    "Chat replies served from the cache", ("tier",))
+reply_cache_misses_total = Counter(
+    "chat_reply_cache_misses_total",
+    "Chat prompts not found in any cache tier")
+reply_cache_evictions_total = Counter(
+    "chat_reply_cache_evictions_total",
+    "Entries dropped from the in-memory tier", ("reason",))
+reply_cache_coalesced_total = Counter(
+    "chat_reply_cache_coalesced_total",
+    "Misses that waited on an identical generation already in flight")
+reply_cache_entries = Gauge(
+    "chat_reply_cache_entries",
+    "Entries in the in-memory tier")
+
+_NOT_WORD = re.compile(r"[^\w]+")
+
+LANGUAGE_ALIASES = {"pg": "pcm"}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Fold case, width, punctuation and spacing so equivalent questions match.
+
+    "When is my FERTILE window??" and "when is my fertile window" give the
+    same result.
+    """
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    return " ".join(_NOT_WORD.sub(" ", text).split())
+
+
+def normalize_language(language: Optional[str]) -> str:
+    # "en-US" -> "en", "PG" -> "pcm"
+    code = (language or "en").strip().lower().replace("_", "-").split("-")[0]
+    return LANGUAGE_ALIASES.get(code, code) or "en"
+
+
+def cache_key(prompt: str, language: str, params: dict) -> str:
+    payload = json.dumps(
+        [normalize_prompt(prompt), normalize_language(language), params],
+        sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _upsert_statement(row: dict):
+    insert = sqlite_insert if IS_SQLITE else pg_insert
+    stmt = insert(ChatReplyCache).values(row)
+    return stmt.on_conflict_do_update(
+        index_elements=[ChatReplyCache.cache_key],
+        set_={column: stmt.excluded[column] for column in ("reply", "created_at", "expires_at")}
+    )
+
+
+class ReplyCache:
+    """LRU + TTL cache of chat replies, keyed on the normalized prompt.
+
+    The in-memory tier holds up to `max_entries` replies per process. With
+    `persist` on, misses fall through to the chat_reply_cache table and new
+    replies are written there too. Identical prompts that miss at the same
+    time share one generation.
+    """
+
+    def __init__(self, max_entries: int = CHAT_REPLY_CACHE_SIZE, ttl: float = CHAT_REPLY_CACHE_TTL,
+                 persist: bool = CHAT_REPLY_CACHE_PERSIST, enabled: bool = CHAT_REPLY_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist = persist
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _get_local(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, reply = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                reply_cache_evictions_total.inc(reason="expired")
+                reply_cache_entries.set(len(self._entries))
+                return None
+            self._entries.move_to_end(key)
+            return reply
+
+    def _put_local(self, key: str, reply: str, ttl: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                reply_cache_evictions_total.inc(reason="capacity")
+            reply_cache_entries.set(len(self._entries))
+
+    async def get(self, key: str) -> Optional[str]:
+        reply = self._get_local(key)
+        if reply is not None:
+            reply_cache_hits_total.inc(tier="memory")
+            return reply
+        if self.persist:
+            now = datetime.utcnow()
+            async with session_scope() as db:
+                row = (await db.execute(
+                    select(ChatReplyCache.reply, ChatReplyCache.expires_at)
+                    .where(ChatReplyCache.cache_key == key, ChatReplyCache.expires_at > now)
+                )).first()
+            if row is not None:
+                self._put_local(key, row.reply, ttl=(row.expires_at - now).total_seconds())
+                reply_cache_hits_total.inc(tier="db")
+                return row.reply
+        reply_cache_misses_total.inc()
+        return None
+
+    async def put(self, key: str, language: str, prompt: str, reply: str):
+        """Cache `reply`. A failed database write is logged, not raised."""
+        self._put_local(key, reply)
+        if not self.persist:
+            return
+        now = datetime.utcnow()
+        try:
+            async with session_scope() as db:
+                await db.execute(_upsert_statement({
+                    "cache_key": key,
+                    "language": normalize_language(language),
+                    "prompt": normalize_prompt(prompt),
+                    "reply": reply,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl),
+                }))
+                await db.commit()
+        except Exception:
+            logger.warning("Could not persist chat reply", extra={"cache_key": key}, exc_info=True)
+
+    async def get_or_generate(self, key: str, language: str, prompt: str,
+                              generate: Callable[[], Awaitable[Tuple[str, bool]]]) -> str:
+        """The cached reply, or the one `generate` returns.
+
+        `generate` returns the reply and whether it may be cached, e.g.
+        False for an English fallback served because translation failed.
+        """
+        reply = await self.get(key)
+        if reply is not None:
+            return reply
+        while (pending := self._in_flight.get(key)) is not None:
+            reply_cache_coalesced_total.inc()
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Only our own cancellation ends this request. If it was the
+                # generating request that went away, the first waiter to
+                # wake up takes over and the rest wait on it.
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting on it; don't warn about an unretrieved exception
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._in_flight[key] = future
+        try:
+            reply, cacheable = await generate()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+        # Waiters get the reply whether or not it can be stored
+        future.set_result(reply)
+        if cacheable:
+            await self.put(key, language, prompt, reply)
+        return reply
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            reply_cache_entries.set(0)
+
+    def stats(self) -> dict:
+        hits = {tier: reply_cache_hits_total.value(tier=tier) for tier in ("memory", "db")}
+        misses = reply_cache_misses_total.value()
+        lookups = sum(hits.values()) + misses
+        return {
+            "enabled": self.enabled,
+            "persist": self.persist,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "coalesced": reply_cache_coalesced_total.value(),
+            "evictions": {reason: reply_cache_evictions_total.value(reason=reason)
+                          for reason in ("capacity", "expired")},
+            "hit_ratio": round(sum(hits.values()) / lookups, 4) if lookups else None,
+        }
+
+
+reply_cache = ReplyCache()
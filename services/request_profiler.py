@@ -0,0 +1,277 @@
+import cProfile
+import hashlib
+import hmac
+import io
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from sqlalchemy import event
+
+from utils.instrumentation import current_phase_times
+from utils.logging_config import request_id_var
+from utils.metrics import Counter
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:
+    PyinstrumentProfiler = None
+
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# Fraction of requests profiled without being asked to
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+# Key for profile tokens; without it only sampling can start a profile
+PROFILE_SECRET = os.getenv("PROFILE_SECRET")
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", 50))
+PROFILE_MAX_SQL = int(os.getenv("PROFILE_MAX_SQL", 200))
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", 40))
+
+PROFILE_HEADER = b"x-profile-token"
+PROFILE_QUERY_PARAM = "profile"
+
+profiles_total = Counter(
+    "request_profiles_total",
+    "Profiled requests by trigger, and requests not profiled because one was running",
+    ("trigger",))
+
+
+def profile_token(path: str, ttl_seconds: int, secret: Optional[str] = PROFILE_SECRET) -> str:
+    """A token that asks for one profile of `path` until it expires."""
+    expires = int(time.time()) + ttl_seconds
+    return f"{expires}.{_sign(secret, path, expires)}"
+
+
+def _sign(secret: str, path: str, expires: int) -> str:
+    return hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+
+
+def verify_token(token: str, path: str, secret: Optional[str] = PROFILE_SECRET) -> bool:
+    if not secret or not token:
+        return False
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _sign(secret, path, int(expires)))
+
+
+class ActiveProfile:
+    __slots__ = ("sql", "sql_dropped")
+
+    def __init__(self):
+        self.sql: List[dict] = []
+        self.sql_dropped = 0
+
+
+_active_profile: ContextVar[Optional[ActiveProfile]] = ContextVar("active_profile", default=None)
+
+
+def _top_functions(profiler: cProfile.Profile, limit: int) -> List[dict]:
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "total_ms": round(total * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+
+class RequestProfiler:
+    """Profiles opted-in requests and keeps the last `buffer_size` results.
+
+    A request is profiled when it carries a valid token (X-Profile-Token
+    header or ?profile=) or is picked at `sample_rate`. pyinstrument is
+    used if installed: its async mode attributes time to this request's
+    task only. Otherwise cProfile runs on the event loop thread, so
+    anything else the loop does meanwhile shows up too. One profile runs
+    at a time either way; requests asking for one while it runs are
+    served unprofiled.
+    """
+
+    def __init__(self, buffer_size: int = PROFILE_BUFFER_SIZE, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 max_sql: int = PROFILE_MAX_SQL, top_functions: int = PROFILE_TOP_FUNCTIONS,
+                 secret: Optional[str] = PROFILE_SECRET):
+        self.sample_rate = sample_rate
+        self.max_sql = max_sql
+        self.top_functions = top_functions
+        self.secret = secret
+        self.engine = "pyinstrument" if PyinstrumentProfiler is not None else "cprofile"
+        self._profiles = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._running = False
+
+    def trigger(self, scope) -> Optional[str]:
+        """Why this request should be profiled, or None."""
+        token = next((value.decode("latin-1") for name, value in scope["headers"]
+                      if name == PROFILE_HEADER), None)
+        if token is not None:
+            return "header" if verify_token(token, scope["path"], self.secret) else None
+        if PROFILE_QUERY_PARAM.encode() in scope["query_string"]:
+            query = dict(parse_qsl(scope["query_string"].decode("latin-1")))
+            token = query.get(PROFILE_QUERY_PARAM)
+            if token is not None:
+                return "query" if verify_token(token, scope["path"], self.secret) else None
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    def start(self):
+        """A running profiler, or None if another profile is in progress."""
+        if self._running:
+            return None
+        self._running = True
+        if PyinstrumentProfiler is not None:
+            profiler = PyinstrumentProfiler(async_mode="enabled")
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def stop(self, profiler) -> dict:
+        """Stop `profiler`; its call tree (pyinstrument) or hottest functions (cProfile)."""
+        try:
+            if PyinstrumentProfiler is not None:
+                profiler.stop()
+                return {"text": profiler.output_text(unicode=False, color=False)}
+            profiler.disable()
+            return {"functions": _top_functions(profiler, self.top_functions)}
+        finally:
+            self._running = False
+
+    def record_sql(self, statement: str, seconds: float):
+        active = _active_profile.get()
+        if active is None:
+            return
+        if len(active.sql) < self.max_sql:
+            active.sql.append({"statement": statement[:1000], "ms": round(seconds * 1000, 3)})
+        else:
+            active.sql_dropped += 1
+
+    def add(self, profile: dict):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def list(self) -> List[dict]:
+        """Newest first, without the call trees."""
+        with self._lock:
+            profiles = list(self._profiles)
+        return [{key: value for key, value in profile.items() if key not in ("sql", "functions", "text")}
+                for profile in reversed(profiles)]
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        with self._lock:
+            return next((p for p in self._profiles if p["id"] == profile_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+    def instrument_engine(self, sync_engine):
+        """Time the statements of profiled requests on `sync_engine`."""
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            if _active_profile.get() is not None:
+                context._profile_started = time.perf_counter()
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            started = getattr(context, "_profile_started", None)
+            if started is not None:
+                self.record_sql(statement, time.perf_counter() - started)
+
+
+request_profiler = RequestProfiler()
+
+
+def _without_profile_param(query_string: bytes) -> bytes:
+    query = [(k, v) for k, v in parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+             if k != PROFILE_QUERY_PARAM]
+    return urlencode(query).encode("latin-1")
+
+
+class ProfilingMiddleware:
+    """Profiles the requests `profiler.trigger` picks and stores the result.
+
+    The profile token is stripped from the query string before the app
+    sees it, and the response carries X-Profile-Id to look the profile up
+    under /internal/profiles.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler = request_profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = self.profiler.trigger(scope)
+        if trigger == "query":
+            # Before the app and the middlewares around it read the query
+            scope["query_string"] = _without_profile_param(scope["query_string"])
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", ()), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profiler = self.profiler.start()
+        if profiler is None:
+            profiles_total.inc(trigger="busy")
+            await self.app(scope, receive, send)
+            return
+
+        active = ActiveProfile()
+        token = _active_profile.set(active)
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            result = self.profiler.stop(profiler)
+            elapsed = time.perf_counter() - started
+            _active_profile.reset(token)
+            profiles_total.inc(trigger=trigger)
+            route = scope.get("route")
+            # Waits cProfile can't see: bcrypt and sync-mode SQL run in worker threads
+            phases = current_phase_times()
+            self.profiler.add({
+                "id": profile_id,
+                "request_id": request_id_var.get(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "status": status_code,
+                "trigger": trigger,
+                "engine": self.profiler.engine,
+                "started_at": started_at.isoformat(),
+                "duration_ms": round(elapsed * 1000, 3),
+                "sql_count": len(active.sql) + active.sql_dropped,
+                "sql_ms": round(sum(q["ms"] for q in active.sql), 3),
+                "sql": active.sql,
+                "sql_dropped": active.sql_dropped,
+                "phase_ms": {phase: round(seconds * 1000, 3) for phase, seconds in phases.items()} if phases else None,
+                **result,
+            })
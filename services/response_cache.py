@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from starlette import status
+
+from utils.etags import etag_matches, strong_etag
+from utils.metrics import Counter, Gauge
+
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+# Bounds how stale an entry can get when another process writes the rows
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 60))
+RESPONSE_CACHE_USERS = int(os.getenv("RESPONSE_CACHE_USERS", 10000))
+
+response_cache_requests_total = Counter(
+    "response_cache_requests_total",
+    "Cached GET requests by route and outcome (not_modified, hit, miss)",
+    ("route", "outcome"))
+response_cache_users = Gauge(
+    "response_cache_users",
+    "Users with at least one cached response")
+
+CACHE_HEADERS = {"Cache-Control": "private, no-cache"}
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResponse:
+    etag: str
+    body: bytes
+    expires_at: float
+
+
+def row_versions(rows: Iterable[Any]) -> tuple:
+    """(table, id, version_id) of each row a response was built from."""
+    return tuple((row.__tablename__, row.id, row.version_id) for row in rows if row is not None)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag, **CACHE_HEADERS})
+
+
+class ResponseCache:
+    """Per-user, in-process cache of serialized GET responses.
+
+    Entries are keyed by (route, query string) and carry a strong ETag
+    built from the versions of the rows behind them. Write endpoints
+    invalidate the routes they change; `ttl` covers writes made by other
+    processes.
+    """
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, max_users: int = RESPONSE_CACHE_USERS,
+                 enabled: bool = RESPONSE_CACHE_ENABLED):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.enabled = enabled and ttl > 0
+        self._users: "OrderedDict[int, Dict[Tuple[str, str], CachedResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, key: Tuple[str, str]) -> Optional[CachedResponse]:
+        with self._lock:
+            entries = self._users.get(user_id)
+            entry = entries.get(key) if entries else None
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del entries[key]
+                return None
+            self._users.move_to_end(user_id)
+            return entry
+
+    def put(self, user_id: int, key: Tuple[str, str], entry: CachedResponse):
+        with self._lock:
+            self._users.setdefault(user_id, {})[key] = entry
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+            response_cache_users.set(len(self._users))
+
+    def invalidate(self, user_id: int, *routes: str):
+        """Drop the user's cached `routes`, or all of them if none are named."""
+        with self._lock:
+            entries = self._users.get(user_id)
+            if entries is None:
+                return
+            if routes:
+                for key in [key for key in entries if key[0] in routes]:
+                    del entries[key]
+            if not routes or not entries:
+                del self._users[user_id]
+            response_cache_users.set(len(self._users))
+
+    def invalidate_route(self, route: str):
+        """Drop `route` for every user, e.g. after a bulk rewrite of its table."""
+        with self._lock:
+            for user_id, entries in list(self._users.items()):
+                for key in [key for key in entries if key[0] == route]:
+                    del entries[key]
+                if not entries:
+                    del self._users[user_id]
+            response_cache_users.set(len(self._users))
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            response_cache_users.set(0)
+
+    async def respond(self, request: Request, user_id: int, route: str,
+                      load: Callable[[], Awaitable[Tuple[Any, Iterable[Any]]]],
+                      adapter: TypeAdapter) -> Response:
+        """Serve `route` for the user from the cache, or build it.
+
+        `load` returns the response data and the ORM rows it came from.
+        A matching If-None-Match gets a 304 without the body being
+        serialized, cached or not.
+        """
+        if_none_match = request.headers.get("if-none-match")
+        key = (route, str(request.url.query))
+        entry = self.get(user_id, key) if self.enabled else None
+        if entry is not None:
+            if etag_matches(if_none_match, entry.etag):
+                response_cache_requests_total.inc(route=route, outcome="not_modified")
+                return not_modified(entry.etag)
+            response_cache_requests_total.inc(route=route, outcome="hit")
+            return Response(entry.body, media_type="application/json",
+                            headers={"ETag": entry.etag, **CACHE_HEADERS})
+
+        data, rows = await load()
+        etag = strong_etag(route, key[1], row_versions(rows))
+        if etag_matches(if_none_match, etag):
+            response_cache_requests_total.inc(route=route, outcome="not_modified")
+            return not_modified(etag)
+        response_cache_requests_total.inc(route=route, outcome="miss")
+        body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+        if self.enabled:
+            self.put(user_id, key, CachedResponse(etag, body, time.monotonic() + self.ttl))
+        return Response(body, media_type="application/json",
+                        headers={"ETag": etag, **CACHE_HEADERS})
+
+    def stats(self) -> dict:
+        outcomes = ("not_modified", "hit", "miss")
+        routes = sorted({labels[0] for labels, _ in response_cache_requests_total.samples()})
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl,
+            "users": len(self._users),
+            "max_users": self.max_users,
+            "requests": {route: {outcome: response_cache_requests_total.value(route=route, outcome=outcome)
+                                 for outcome in outcomes}
+                         for route in routes},
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,215 @@
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from deep_translator import GoogleTranslator
+
+from utils.instrumentation import outbound_http_seconds, phase_timer
+from utils.metrics import Counter, Gauge, Histogram
+
+
+TRANSLATION_BACKEND = os.getenv("TRANSLATION_BACKEND", "google")
+TRANSLATION_BATCH_SIZE = int(os.getenv("TRANSLATION_BATCH_SIZE", 32))
+# How long the first text of a batch waits for company before it is sent anyway
+TRANSLATION_BATCH_WAIT_MS = float(os.getenv("TRANSLATION_BATCH_WAIT_MS", 5))
+TRANSLATION_TIMEOUT_SECONDS = float(os.getenv("TRANSLATION_TIMEOUT_SECONDS", 15))
+ECHO_TRANSLATION_CALL_SECONDS = float(os.getenv("ECHO_TRANSLATION_CALL_SECONDS", 0))
+SOURCE_LANGUAGE = "en"
+
+translation_pending = Gauge(
+    "translation_pending",
+    "Texts waiting for their batch to be sent")
+translation_batches_total = Counter(
+    "translation_batches_total",
+    "Batches sent to the translation backend", ("language", "outcome"))
+translation_batch_size = Histogram(
+    "translation_batch_size",
+    "Distinct texts per backend call", ("language",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+translation_batch_seconds = Histogram(
+    "translation_batch_seconds",
+    "Time spent in one backend call", ("language",))
+
+
+class TranslationBackend(ABC):
+    """Translates many English texts into one language in a single call."""
+
+    name = "base"
+
+    @abstractmethod
+    async def translate_batch(self, texts: List[str], language: str) -> List[str]:
+        ...
+
+    async def close(self):
+        pass
+
+
+class GoogleBackend(TranslationBackend):
+    """Google Translate through deep_translator.
+
+    Texts are joined with a marker line and sent as one request of at most
+    `max_chars`. If the marker does not survive translation, that group
+    falls back to one request per text.
+    """
+
+    name = "google"
+    SEPARATOR = "\n⁂\n"
+
+    def __init__(self, max_chars: int = 4500):
+        self.max_chars = max_chars
+
+    def _groups(self, texts: List[str]) -> List[List[str]]:
+        groups, current, size = [], [], 0
+        for text in texts:
+            added = len(text) + len(self.SEPARATOR)
+            if current and size + added > self.max_chars:
+                groups.append(current)
+                current, size = [], 0
+            current.append(text)
+            size += added
+        if current:
+            groups.append(current)
+        return groups
+
+    def _translate_group(self, translator: GoogleTranslator, group: List[str]) -> List[str]:
+        if len(group) > 1:
+            joined = translator.translate(self.SEPARATOR.join(group))
+            parts = [part.strip() for part in (joined or "").split(self.SEPARATOR.strip())]
+            if len(parts) == len(group) and all(parts):
+                return parts
+        return [translator.translate(text) for text in group]
+
+    def _translate_all(self, texts: List[str], language: str) -> List[str]:
+        translator = GoogleTranslator(source=SOURCE_LANGUAGE, target=language)
+        results = []
+        for group in self._groups(texts):
+            results.extend(self._translate_group(translator, group))
+        return results
+
+    async def translate_batch(self, texts, language):
+        return await asyncio.to_thread(self._translate_all, texts, language)
+
+
+class EchoBackend(TranslationBackend):
+    """Deterministic stand-in: "[yo] <text>". For tests and benchmarks.
+
+    `call_seconds` simulates the fixed round trip of a real provider.
+    """
+
+    name = "echo"
+
+    def __init__(self, call_seconds: float = ECHO_TRANSLATION_CALL_SECONDS):
+        self.call_seconds = call_seconds
+        self.calls = 0
+
+    async def translate_batch(self, texts, language):
+        self.calls += 1
+        if self.call_seconds:
+            await asyncio.sleep(self.call_seconds)
+        return [f"[{language}] {text}" for text in texts]
+
+
+def build_backend(name: str = TRANSLATION_BACKEND) -> TranslationBackend:
+    if name == "google":
+        return GoogleBackend()
+    if name == "echo":
+        return EchoBackend()
+    raise ValueError(f"Unknown TRANSLATION_BACKEND: {name}")
+
+
+class TranslationPipeline:
+    """Micro-batches translation requests per target language.
+
+    Each `translate` call joins the pending batch for its language. The
+    batch is sent once it holds `max_batch` texts or `max_wait_ms` after
+    its first text arrived, whichever comes first. Identical texts in a
+    batch are translated once. Results, or the backend's error, are
+    handed back to every waiting caller.
+    """
+
+    def __init__(self, backend_factory=build_backend, max_batch: int = TRANSLATION_BATCH_SIZE,
+                 max_wait_ms: float = TRANSLATION_BATCH_WAIT_MS,
+                 timeout: float = TRANSLATION_TIMEOUT_SECONDS):
+        self.backend_factory = backend_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.timeout = timeout
+        self._backend: Optional[TranslationBackend] = None
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future]]] = defaultdict(list)
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks = set()
+
+    @property
+    def backend(self) -> TranslationBackend:
+        if self._backend is None:
+            self._backend = self.backend_factory()
+        return self._backend
+
+    async def translate(self, text: str, language: str) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending[language]
+        pending.append((text, future))
+        translation_pending.inc()
+        if len(pending) >= self.max_batch:
+            self._flush(language)
+        elif language not in self._timers:
+            self._timers[language] = loop.call_later(self.max_wait, self._flush, language)
+        with phase_timer("outbound"):
+            return await future
+
+    def _flush(self, language: str):
+        timer = self._timers.pop(language, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(language, [])
+        if not batch:
+            return
+        translation_pending.dec(len(batch))
+        task = asyncio.get_running_loop().create_task(self._send(language, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, language: str, batch: List[Tuple[str, asyncio.Future]]):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        translation_batch_size.observe(len(texts), language=language)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            translated = await asyncio.wait_for(
+                self.backend.translate_batch(texts, language), self.timeout)
+            if len(translated) != len(texts):
+                raise ValueError(f"backend returned {len(translated)} texts for {len(texts)}")
+            outcome = "ok"
+        except Exception as e:
+            translation_batches_total.inc(language=language, outcome="error")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            elapsed = time.perf_counter() - started
+            translation_batch_seconds.observe(elapsed, language=language)
+            # Not charged to a request: a batch serves many, and each caller's
+            # wait is counted in translate()
+            outbound_http_seconds.observe(elapsed, service=self.backend.name, outcome=outcome)
+        translation_batches_total.inc(language=language, outcome="ok")
+        results = dict(zip(texts, translated))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(results[text])
+
+    async def close(self):
+        for language in list(self._pending):
+            self._flush(language)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._backend is not None:
+            await self._backend.close()
+            self._backend = None
+
+
+translation_pipeline = TranslationPipeline()
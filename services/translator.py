@@ -1,7 +1,229 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import IS_SQLITE, session_scope
+from models import CashedTranslations
+from services.translation_pipeline import SOURCE_LANGUAGE, translation_pipeline
+from utils.metrics import Counter, Gauge
 from utils.translations import TRANSLATIONS
 
 
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", 2000))
+# Most recent cached_translations rows loaded into memory at startup
+TRANSLATION_CACHE_WARM_ROWS = int(os.getenv("TRANSLATION_CACHE_WARM_ROWS", 500))
+# After a failed translation, texts in that language are served in English
+# without calling the backend for this long (e.g. pcm, which Google rejects)
+TRANSLATION_FAILURE_TTL = float(os.getenv("TRANSLATION_FAILURE_TTL", 300))
+
+logger = logging.getLogger(__name__)
+
+translation_cache_hits_total = Counter(
+    "translation_cache_hits_total",
+    "Translations served from a cache tier", ("tier",))
+translation_cache_misses_total = Counter(
+    "translation_cache_misses_total",
+    "Translations that had to be machine translated")
+translation_errors_total = Counter(
+    "translation_errors_total",
+    "Machine translations that failed; the source text was returned")
+translation_skipped_total = Counter(
+    "translation_skipped_total",
+    "Texts served in English because their language failed recently", ("language",))
+translation_cache_entries = Gauge(
+    "translation_cache_entries",
+    "Dynamic entries in the in-memory translation tier")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _upsert_statement(rows: list):
+    insert = sqlite_insert if IS_SQLITE else pg_insert
+    stmt = insert(CashedTranslations).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[CashedTranslations.language, CashedTranslations.text_hash],
+        set_={"translated_text": stmt.excluded.translated_text}
+    )
+
+
+class TranslationCache:
+    """Two-tier cache of English text translated into the app languages.
+
+    The memory tier is the static TRANSLATIONS table, keyed by the English
+    text of each entry, plus an LRU of up to `max_entries` dynamic
+    translations. Behind it sits the cached_translations table, shared by
+    every process. Both are keyed on (language, sha256(text)).
+    """
+
+    def __init__(self, max_entries: int = TRANSLATION_CACHE_SIZE,
+                 failure_ttl: float = TRANSLATION_FAILURE_TTL):
+        self.max_entries = max_entries
+        self.failure_ttl = failure_ttl
+        self._static: Dict[Tuple[str, str], str] = {}
+        self._entries: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        # language -> monotonic time until which it is not sent to the backend
+        self._failed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.load_static(TRANSLATIONS)
+
+    def load_static(self, translations: dict):
+        source = translations.get(SOURCE_LANGUAGE, {})
+        for language, entries in translations.items():
+            for key, translated in entries.items():
+                if key in source:
+                    self._static[language, text_hash(source[key])] = translated
+
+    def _get_local(self, key: Tuple[str, str]) -> Optional[str]:
+        translated = self._static.get(key)
+        if translated is not None:
+            translation_cache_hits_total.inc(tier="static")
+            return translated
+        with self._lock:
+            translated = self._entries.get(key)
+            if translated is not None:
+                self._entries.move_to_end(key)
+        if translated is not None:
+            translation_cache_hits_total.inc(tier="memory")
+        return translated
+
+    def _put_local(self, key: Tuple[str, str], translated: str):
+        with self._lock:
+            self._entries[key] = translated
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            translation_cache_entries.set(len(self._entries))
+
+    async def get(self, text: str, language: str) -> Optional[str]:
+        key = (language, text_hash(text))
+        translated = self._get_local(key)
+        if translated is not None:
+            return translated
+        async with session_scope() as db:
+            translated = await db.scalar(
+                select(CashedTranslations.translated_text)
+                .where(CashedTranslations.language == language,
+                       CashedTranslations.text_hash == key[1])
+            )
+        if translated is not None:
+            translation_cache_hits_total.inc(tier="db")
+            self._put_local(key, translated)
+        return translated
+
+    async def put_many(self, language: str, translations: Dict[str, str]):
+        """Store {source text: translation} in both tiers."""
+        if not translations:
+            return
+        rows = []
+        for text, translated in translations.items():
+            digest = text_hash(text)
+            self._put_local((language, digest), translated)
+            rows.append({"original_text": text, "text_hash": digest,
+                         "translated_text": translated, "language": language})
+        async with session_scope() as db:
+            await db.execute(_upsert_statement(rows))
+            await db.commit()
+
+    async def put(self, text: str, language: str, translated: str):
+        await self.put_many(language, {text: translated})
+
+    def mark_failed(self, language: str):
+        if self.failure_ttl > 0:
+            self._failed[language] = time.monotonic() + self.failure_ttl
+
+    def recently_failed(self, language: str) -> bool:
+        until = self._failed.get(language)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            self._failed.pop(language, None)
+            return False
+        return True
+
+    async def warm(self, rows: int = TRANSLATION_CACHE_WARM_ROWS) -> int:
+        """Load the most recently added translations into the memory tier."""
+        if rows <= 0:
+            return 0
+        async with session_scope() as db:
+            result = await db.execute(
+                select(CashedTranslations.language, CashedTranslations.text_hash,
+                       CashedTranslations.translated_text)
+                .order_by(CashedTranslations.id.desc())
+                .limit(min(rows, self.max_entries))
+            )
+            loaded = result.all()
+        # Oldest first, so the newest end up most recently used
+        for language, digest, translated in reversed(loaded):
+            self._put_local((language, digest), translated)
+        return len(loaded)
+
+    def stats(self) -> dict:
+        hits = {tier: translation_cache_hits_total.value(tier=tier)
+                for tier in ("static", "memory", "db")}
+        misses = translation_cache_misses_total.value()
+        lookups = sum(hits.values()) + misses
+        return {
+            "static_entries": len(self._static),
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "errors": translation_errors_total.value(),
+            "failing_languages": sorted(lang for lang in list(self._failed) if self.recently_failed(lang)),
+            "hit_ratio": round(sum(hits.values()) / lookups, 4) if lookups else None,
+            "tier_hit_ratios": {tier: round(count / lookups, 4) if lookups else None
+                                for tier, count in hits.items()},
+        }
+
+
+translation_cache = TranslationCache()
+
+
 def translate_insight(key: str, language: str) -> str:
     """Translate an insight key into the selected language."""
     lang = language.lower()  # e.g., 'yo', 'ig', 'ha','pg'
     return TRANSLATIONS.get(lang, {}).get(key, key)
+
+
+async def translate_text(text: str, language: str) -> Tuple[str, bool]:
+    """Translate free English text, e.g. a chat reply, into `language`.
+
+    Returns the text to show and whether it is in `language`. Served from
+    the cache when possible. A miss goes through the batching translation
+    pipeline and is stored in both tiers. If translation fails the English
+    text comes back with False, uncached, and so does every other miss in
+    that language for TRANSLATION_FAILURE_TTL seconds. Callers must not
+    cache a False result as the translation.
+    """
+    lang = language.lower()
+    if lang == SOURCE_LANGUAGE or not text.strip():
+        return text, True
+    translated = await translation_cache.get(text, lang)
+    if translated is not None:
+        return translated, True
+    if translation_cache.recently_failed(lang):
+        translation_skipped_total.inc(language=lang)
+        return text, False
+    translation_cache_misses_total.inc()
+    try:
+        translated = await translation_pipeline.translate(text, lang)
+    except Exception:
+        translation_errors_total.inc()
+        translation_cache.mark_failed(lang)
+        logger.warning("Translation failed, serving English", extra={"language": lang,
+                       "retry_after_seconds": translation_cache.failure_ttl}, exc_info=True)
+        return text, False
+    if not translated:
+        return text, False
+    await translation_cache.put(text, lang, translated)
+    return translated, True
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Annotated, Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException
+from sqlalchemy.orm import joinedload, selectinload
+from starlette import status
+
+from database import db_dependency
+from models import Users
+from utils.enum import LanguageEnum, RoleEnum
+from utils.utils import get_current_user
+
+
+USER_CONTEXT_TTL = float(os.getenv("USER_CONTEXT_TTL", 60))
+
+user_dependency = Annotated[dict, Depends(get_current_user)]
+
+
+@dataclass(frozen=True)
+class UserContext:
+    """The handful of user fields most handlers need, safe to cache briefly."""
+    id: int
+    email: str
+    role: RoleEnum
+    language_preference: LanguageEnum
+
+    @classmethod
+    def from_user(cls, db_user: Users) -> "UserContext":
+        return cls(
+            id=db_user.id,
+            email=db_user.email,
+            role=db_user.role,
+            language_preference=db_user.language_preference or LanguageEnum.ENGLISH
+        )
+
+
+class UserContextCache:
+    """Per-process TTL cache of UserContext, keyed by user id."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[int, Tuple[float, UserContext]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[UserContext]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, context = entry
+        if expires_at <= time.monotonic():
+            self.invalidate(user_id)
+            return None
+        return context
+
+    def put(self, db_user: Users) -> UserContext:
+        context = UserContext.from_user(db_user)
+        if self.ttl > 0:
+            with self._lock:
+                self._entries[db_user.id] = (time.monotonic() + self.ttl, context)
+        return context
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+user_context_cache = UserContextCache(USER_CONTEXT_TTL)
+
+
+@lru_cache(maxsize=None)
+def load_current_user(*relations: str):
+    """Dependency returning the signed-in user's row, loaded once per request.
+
+    `relations` names relationships on Users (profile, cycles, insights) to
+    load eagerly. The same relations always map to the same dependency
+    callable, so FastAPI resolves it only once per request.
+    """
+    options = []
+    for name in relations:
+        attribute = getattr(Users, name)
+        loader = selectinload if attribute.property.uselist else joinedload
+        options.append(loader(attribute))
+
+    async def dependency(user: user_dependency, db: db_dependency) -> Users:
+        db_user = await db.get(Users, user['id'], options=options)
+        if not db_user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="User Not Found!")
+        user_context_cache.put(db_user)
+        return db_user
+
+    return dependency
+
+
+current_db_user = load_current_user()
+
+
+async def current_user_context(user: user_dependency, db: db_dependency) -> UserContext:
+    context = user_context_cache.get(user['id'])
+    if context is not None:
+        return context
+    db_user = await db.get(Users, user['id'])
+    if not db_user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="User Not Found!")
+    return user_context_cache.put(db_user)
+
+
+db_user_dependency = Annotated[Users, Depends(current_db_user)]
+user_context_dependency = Annotated[UserContext, Depends(current_user_context)]
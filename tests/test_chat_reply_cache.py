@@ -0,0 +1,58 @@
+import asyncio
+import os
+
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+import pytest
+
+from routers import messages
+from schemas import MessageRequest
+from services.llm_client import FakeProvider, LLMClient
+from services.reply_cache import ReplyCache
+from services.translator import translation_cache
+from services.user_context import UserContext
+from utils.enum import LanguageEnum, RoleEnum
+
+
+USER = UserContext(id=1, email="user@example.com", role=RoleEnum.USER,
+                   language_preference=LanguageEnum.YORUBA)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ReplyCache(persist=False, enabled=True)
+    monkeypatch.setattr(messages, "reply_cache", cache)
+    monkeypatch.setattr(messages, "llm_client",
+                        LLMClient(provider_factory=lambda: FakeProvider(0, 0)))
+    return cache
+
+
+@pytest.fixture
+def failing_translation(monkeypatch):
+    async def no_cached_translation(text, language):
+        return None
+
+    async def fail(text, language):
+        raise RuntimeError("translation backend down")
+
+    monkeypatch.setattr(translation_cache, "get", no_cached_translation)
+    monkeypatch.setattr(translation_cache, "_failed", {})
+    monkeypatch.setattr("services.translator.translation_pipeline.translate", fail)
+
+
+def test_english_fallback_is_not_cached(cache, failing_translation):
+    request = MessageRequest(message="Is spotting normal?")
+    response = asyncio.run(messages.chat_bot(request, USER))
+    assert response["reply"].startswith("Thanks for your question")
+    assert cache.stats()["entries"] == 0
+
+
+def test_streamed_english_fallback_is_not_cached(cache, failing_translation):
+    async def stream():
+        response = await messages.chat_bot_stream(MessageRequest(message="Is spotting normal?"), USER)
+        return "".join([event async for event in response.body_iterator])
+
+    body = asyncio.run(stream())
+    assert "event: done" in body
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,56 @@
+import asyncio
+import os
+
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from services import reply_cache as reply_cache_module
+from services.reply_cache import ReplyCache
+
+
+def test_waiter_takes_over_when_leader_is_cancelled():
+    cache = ReplyCache(persist=False, enabled=True)
+    calls = []
+
+    async def generate():
+        calls.append(asyncio.current_task())
+        await asyncio.sleep(0.05)
+        return "reply", True
+
+    async def run():
+        leader = asyncio.create_task(cache.get_or_generate("k", "en", "hi", generate))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.get_or_generate("k", "en", "hi", generate))
+                   for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(run()) == ["reply"] * 3
+    # The leader and the one waiter that took over
+    assert len(calls) == 2
+    assert cache.stats()["entries"] == 1
+
+
+def test_persist_failure_still_returns_the_reply(monkeypatch):
+    cache = ReplyCache(persist=True, enabled=True)
+
+    async def miss(key):
+        return None
+
+    def broken_session():
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(cache, "get", miss)
+    monkeypatch.setattr(reply_cache_module, "session_scope", broken_session)
+
+    async def generate():
+        await asyncio.sleep(0.01)
+        return "reply", True
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_generate("k", "en", "hi", generate)
+                                      for _ in range(3)))
+
+    assert asyncio.run(run()) == ["reply"] * 3
+    assert cache._get_local("k") == "reply"
@@ -0,0 +1,71 @@
+from datetime import date
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+from utils.symptoms import SYMPTOMS
+
+
+# Kept for callers that predate utils.symptoms
+SYMPTOM_BITS = SYMPTOMS.bits
+encode_symptoms = SYMPTOMS.encode
+
+
+class BatchPrediction(NamedTuple):
+    period_start: np.ndarray      # datetime64[D]
+    period_end: np.ndarray        # datetime64[D]
+    period_length: np.ndarray     # int
+    next_period: np.ndarray       # datetime64[D]
+    ovulation_day: np.ndarray     # datetime64[D]
+    fertile_start: np.ndarray     # datetime64[D]
+    fertile_end: np.ndarray       # datetime64[D]
+    fertility_score: np.ndarray   # int16
+
+    def __len__(self):
+        return len(self.period_start)
+
+
+def to_day_array(dates: Sequence[date] | np.ndarray) -> np.ndarray:
+    return np.asarray(dates, dtype="datetime64[D]")
+
+
+def symptom_scores(symptom_masks: np.ndarray) -> np.ndarray:
+    return SYMPTOMS.scores(symptom_masks)
+
+
+def predict_batch(
+    last_period_dates: Sequence[date] | np.ndarray,
+    cycle_lengths: Sequence[int] | np.ndarray,
+    period_lengths: Sequence[int] | np.ndarray,
+    symptom_masks: Sequence[int] | np.ndarray | None = None
+) -> BatchPrediction:
+    """Vectorized `predict_cycle` for many users at once.
+
+    Lengths of 0 fall back to the same defaults as the scalar function
+    (28 and 5). Row i matches `predict_cycle` for the same inputs;
+    symptoms come as SYMPTOMS bitmasks.
+    """
+    last_period = to_day_array(last_period_dates)
+    cycle = np.asarray(cycle_lengths, dtype=np.int64)
+    period = np.asarray(period_lengths, dtype=np.int64)
+    cycle = np.where(cycle == 0, 28, cycle)
+    period = np.where(period == 0, 5, period)
+
+    ovulation = last_period + (cycle - 14).astype("timedelta64[D]")
+
+    if symptom_masks is None:
+        score = np.full(len(last_period), 80, dtype=np.int16)
+    else:
+        score = 80 + symptom_scores(symptom_masks)
+    score = np.clip(score, 0, 100).astype(np.int16)
+
+    return BatchPrediction(
+        period_start=last_period,
+        period_end=last_period + (period - 1).astype("timedelta64[D]"),
+        period_length=period,
+        next_period=last_period + cycle.astype("timedelta64[D]"),
+        ovulation_day=ovulation,
+        fertile_start=ovulation - np.timedelta64(2, "D"),
+        fertile_end=ovulation + np.timedelta64(2, "D"),
+        fertility_score=score
+    )
@@ -0,0 +1,80 @@
+from datetime import date, timedelta
+from typing import List, Tuple
+
+import numpy as np
+
+from utils.batch_predictions import predict_batch
+from utils.etags import etag_matches, weak_etag
+
+
+# Day states, in increasing priority when ranges overlap
+DAY_STATES = ("none", "period", "fertile", "ovulation")
+NONE, PERIOD, FERTILE, OVULATION = range(len(DAY_STATES))
+
+# Bump whenever the projection changes, so clients drop cached calendars
+CALENDAR_VERSION = 1
+
+
+def month_window(today: date, months: int) -> Tuple[date, date]:
+    """First day of today's month through the last day `months` months on."""
+    start = today.replace(day=1)
+    year, month = divmod(start.month - 1 + months, 12)
+    end = date(start.year + year, month + 1, 1) - timedelta(days=1)
+    return start, end
+
+
+def calendar_etag(*parts) -> str:
+    return weak_etag(CALENDAR_VERSION, *parts)
+
+
+def _paint(states: np.ndarray, starts: np.ndarray, ends: np.ndarray, state: int):
+    """Set `state` on every day in the [start, end] index ranges, clipped to the array."""
+    n = len(states)
+    starts = np.clip(starts, 0, n)
+    ends = np.clip(ends + 1, 0, n)
+    keep = starts < ends
+    covered = np.zeros(n + 1, dtype=np.int32)
+    np.add.at(covered, starts[keep], 1)
+    np.add.at(covered, ends[keep], -1)
+    states[np.cumsum(covered[:-1]) > 0] = state
+
+
+def project_day_states(last_period_date: date, cycle_length: int, period_length: int,
+                       start: date, end: date) -> np.ndarray:
+    """Day state for every day from `start` to `end`, one int8 per day.
+
+    Cycles repeat every `cycle_length` days from `last_period_date`; days
+    before it are NONE. All cycles in the window are predicted in one
+    predict_batch call.
+    """
+    days = (end - start).days + 1
+    states = np.full(days, NONE, dtype=np.int8)
+    if days <= 0 or last_period_date > end:
+        return states[:max(days, 0)]
+
+    cycle_length = cycle_length or 28
+    first = max(0, (start - last_period_date).days // cycle_length)
+    last = (end - last_period_date).days // cycle_length
+    k = np.arange(first, last + 1)
+    cycle_starts = np.datetime64(last_period_date, "D") + (k * cycle_length).astype("timedelta64[D]")
+    prediction = predict_batch(cycle_starts, np.full(len(k), cycle_length),
+                               np.full(len(k), period_length or 0))
+
+    origin = np.datetime64(start, "D")
+
+    def index(days):
+        return (days - origin).astype(np.int64)
+
+    _paint(states, index(prediction.period_start), index(prediction.period_end), PERIOD)
+    _paint(states, index(prediction.fertile_start), index(prediction.fertile_end), FERTILE)
+    _paint(states, index(prediction.ovulation_day), index(prediction.ovulation_day), OVULATION)
+    return states
+
+
+def run_length_encode(states: np.ndarray) -> List[List[int]]:
+    """[[state, days], ...] for consecutive runs of the same state."""
+    if len(states) == 0:
+        return []
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(states)) + 1))
+    lengths = np.diff(np.concatenate((starts, [len(states)])))
+    return np.stack((states[starts].astype(np.int64), lengths), axis=1).tolist()
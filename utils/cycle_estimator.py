@@ -0,0 +1,157 @@
+import math
+import os
+from dataclasses import dataclass
+from datetime import date, timedelta
+from statistics import NormalDist
+from typing import NamedTuple, Optional, Tuple
+
+from schemas import CycleForecast
+from utils.predictions import CyclePredictionResult, predict_cycle
+
+
+# Weight of the newest cycle once a user has more than 1/alpha of them;
+# before that every observed cycle counts equally
+CYCLE_EWMA_ALPHA = float(os.getenv("CYCLE_EWMA_ALPHA", 0.3))
+CYCLE_CONFIDENCE_LEVEL = float(os.getenv("CYCLE_CONFIDENCE_LEVEL", 0.9))
+
+# Gaps between logged periods outside this range are a missed or extra
+# log, not a cycle, and are not learned from
+MIN_CYCLE_DAYS = 18
+MAX_CYCLE_DAYS = 45
+# Typical cycle-to-cycle spread, and how many observed cycles it is worth,
+# so two similar cycles don't claim near-certainty
+PRIOR_SD_DAYS = 3.0
+PRIOR_WEIGHT = 2
+LUTEAL_DAYS = 14
+
+
+class CycleSummary(NamedTuple):
+    """Running state of one user's cycle-length estimate.
+
+    `mean_length` and `var_length` are an exponentially weighted mean and
+    variance of the observed cycle lengths, updated in O(1) per cycle;
+    `cycles_observed` counts the gaps they were learned from.
+    """
+    last_period_date: date
+    cycles_observed: int
+    mean_length: float
+    var_length: float
+    period_length: float
+    reported_length: int
+
+
+def observe_cycle(summary: Optional[CycleSummary], period_start: date,
+                  cycle_length: int, period_length: int) -> Optional[CycleSummary]:
+    """Fold a newly logged period into `summary`.
+
+    Returns None when `period_start` is older than the latest logged
+    period: the gaps on both sides change, so the caller must rebuild the
+    summary from history in date order.
+    """
+    cycle_length = cycle_length or 28
+    period_length = period_length or 5
+    if summary is None:
+        return CycleSummary(period_start, 0, float(cycle_length), 0.0,
+                            float(period_length), cycle_length)
+    if period_start < summary.last_period_date:
+        return None
+
+    n = summary.cycles_observed + 1
+    alpha = max(CYCLE_EWMA_ALPHA, 1 / n)
+    period = summary.period_length + alpha * (period_length - summary.period_length)
+    gap = (period_start - summary.last_period_date).days
+    if not MIN_CYCLE_DAYS <= gap <= MAX_CYCLE_DAYS:
+        # Same day re-logged, or a gap that isn't one cycle
+        return summary._replace(last_period_date=period_start, period_length=period,
+                                reported_length=cycle_length)
+
+    # West's incremental weighted mean and variance
+    diff = gap - summary.mean_length
+    step = alpha * diff
+    return CycleSummary(
+        last_period_date=period_start,
+        cycles_observed=n,
+        mean_length=summary.mean_length + step,
+        var_length=(1 - alpha) * (summary.var_length + diff * step),
+        period_length=period,
+        reported_length=cycle_length,
+    )
+
+
+def estimate_length(summary: CycleSummary) -> Tuple[float, float]:
+    """Expected cycle length and its standard deviation, in days.
+
+    With no observed cycles this is the length the user reported; after
+    that the learned variance is pooled with the prior spread.
+    """
+    n = summary.cycles_observed
+    variance = (PRIOR_WEIGHT * PRIOR_SD_DAYS ** 2 + n * summary.var_length) / (PRIOR_WEIGHT + n)
+    return expected_length(n, summary.mean_length, summary.reported_length), math.sqrt(variance)
+
+
+def expected_length(cycles_observed: int, mean_length: float, reported_length: int) -> float:
+    if cycles_observed == 0:
+        return float(reported_length)
+    return min(max(mean_length, MIN_CYCLE_DAYS), MAX_CYCLE_DAYS)
+
+
+def summarize_cycles(cycles) -> Optional[CycleSummary]:
+    """Summary of (period_start, cycle_length, period_length) rows, oldest first."""
+    summary = None
+    for period_start, cycle_length, period_length in cycles:
+        summary = observe_cycle(summary, period_start, cycle_length, period_length)
+    return summary
+
+
+@dataclass(frozen=True, slots=True)
+class CycleForecastResult:
+    prediction: CyclePredictionResult
+    cycles_observed: int
+    cycle_length_estimate: float
+    cycle_length_sd: float
+    confidence_level: float
+    next_period_range: Tuple[date, date]
+    fertile_window_range: Tuple[date, date]
+
+    def to_schema(self) -> CycleForecast:
+        return CycleForecast(
+            **self.prediction.to_schema().model_dump(),
+            cycles_observed=self.cycles_observed,
+            cycle_length_estimate=round(self.cycle_length_estimate, 1),
+            cycle_length_sd=round(self.cycle_length_sd, 1),
+            confidence_level=self.confidence_level,
+            next_period_range=list(self.next_period_range),
+            fertile_window_range=list(self.fertile_window_range)
+        )
+
+
+def forecast_cycle(summary: CycleSummary, symptoms: list[str] | None,
+                   confidence_level: float = CYCLE_CONFIDENCE_LEVEL) -> CycleForecastResult:
+    """`predict_cycle` at the estimated length, plus `confidence_level`
+    intervals for the next period and the fertile window.
+
+    Ovulation is LUTEAL_DAYS before the next period, so its uncertainty is
+    the cycle length's; the fertile window range spans the earliest to the
+    latest possible window.
+    """
+    mean, sd = estimate_length(summary)
+    prediction = predict_cycle(
+        cycle_length=round(mean),
+        last_period_date=summary.last_period_date,
+        period_length=round(summary.period_length),
+        symptoms=symptoms
+    )
+    margin = NormalDist().inv_cdf(0.5 + confidence_level / 2) * sd
+    start = summary.last_period_date
+    earliest = start + timedelta(days=math.floor(mean - margin))
+    latest = start + timedelta(days=math.ceil(mean + margin))
+    return CycleForecastResult(
+        prediction=prediction,
+        cycles_observed=summary.cycles_observed,
+        cycle_length_estimate=mean,
+        cycle_length_sd=sd,
+        confidence_level=confidence_level,
+        next_period_range=(earliest, latest),
+        fertile_window_range=(earliest - timedelta(days=LUTEAL_DAYS + 2),
+                              latest - timedelta(days=LUTEAL_DAYS - 2))
+    )
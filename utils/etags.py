@@ -0,0 +1,22 @@
+import hashlib
+
+
+def _digest(parts) -> str:
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def strong_etag(*parts) -> str:
+    return f'"{_digest(parts)}"'
+
+
+def weak_etag(*parts) -> str:
+    return f'W/"{_digest(parts)}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against `etag`."""
+    if not if_none_match:
+        return False
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip() == "*" or tag.strip().removeprefix("W/") == wanted
+               for tag in if_none_match.split(","))
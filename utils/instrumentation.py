@@ -0,0 +1,162 @@
+import hmac
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from starlette import status
+
+from utils.metrics import Counter, Gauge, Histogram, render_prometheus
+
+
+# Off by default: no middleware, no SQL hooks and no /metrics route
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+# When set, scrapes must send "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Time a request spends waiting on each of these; the rest is "app"
+PHASES = ("db", "bcrypt", "outbound")
+
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served")
+http_requests_total = Counter(
+    "http_requests_total",
+    "HTTP requests served", ("method", "route", "status"))
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to the end of its response body", ("method", "route"))
+http_request_phase_seconds = Histogram(
+    "http_request_phase_seconds",
+    "Time each request spent in the DB, bcrypt, outbound HTTP calls and the app itself",
+    ("route", "phase"))
+db_query_seconds = Histogram(
+    "db_query_seconds",
+    "Time spent executing one SQL statement", ("engine", "operation"))
+outbound_http_seconds = Histogram(
+    "outbound_http_seconds",
+    "Time spent in calls to third-party APIs", ("service", "outcome"))
+
+
+class RequestTimings:
+    __slots__ = PHASES
+
+    def __init__(self):
+        for phase in PHASES:
+            setattr(self, phase, 0.0)
+
+
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def add_time(phase: str, seconds: float):
+    """Charge `seconds` of `phase` to the request being served, if any."""
+    timings = _request_timings.get()
+    if timings is not None:
+        setattr(timings, phase, getattr(timings, phase) + seconds)
+
+
+def current_phase_times() -> Optional[dict]:
+    """Seconds charged to each phase so far in this request (metrics must be enabled)."""
+    timings = _request_timings.get()
+    if timings is None:
+        return None
+    return {phase: getattr(timings, phase) for phase in PHASES}
+
+
+@contextmanager
+def phase_timer(phase: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(phase, time.perf_counter() - started)
+
+
+def observe_outbound(service: str, seconds: float, outcome: str):
+    outbound_http_seconds.observe(seconds, service=service, outcome=outcome)
+    add_time("outbound", seconds)
+
+
+def route_label(scope) -> str:
+    # The path template, not the raw path, so ids don't explode the label set
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class RequestMetricsMiddleware:
+    """Times every HTTP request and splits it into PHASES.
+
+    A plain ASGI middleware, so streamed responses are timed to their last
+    chunk and nothing runs in an extra task. DB, bcrypt and outbound time
+    are added to the request's RequestTimings through a context variable,
+    which worker threads and SQLAlchemy's greenlets inherit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            _request_timings.reset(token)
+
+            method, route = scope["method"], route_label(scope)
+            http_requests_total.inc(method=method, route=route, status=status_code)
+            http_request_duration_seconds.observe(elapsed, method=method, route=route)
+            waited = 0.0
+            for phase in PHASES:
+                seconds = getattr(timings, phase)
+                waited += seconds
+                http_request_phase_seconds.observe(seconds, route=route, phase=phase)
+            http_request_phase_seconds.observe(max(elapsed - waited, 0.0), route=route, phase="app")
+
+
+def _operation(statement: str) -> str:
+    words = statement.split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+
+def instrument_engine(sync_engine, label: str):
+    """Time every statement `sync_engine` runs and charge it to the request."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started
+        db_query_seconds.observe(elapsed, engine=label, operation=_operation(statement))
+        add_time("db", elapsed)
+
+
+def metrics_response(request: Request) -> Response:
+    if METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+            return Response(status_code=status.HTTP_401_UNAUTHORIZED,
+                            headers={"WWW-Authenticate": "Bearer"})
+    return Response(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,238 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from utils.metrics import Counter
+
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per-logger overrides, e.g. "routers.auth=DEBUG,sqlalchemy.engine=INFO". httpx
+# logs every outbound request at INFO; outbound_http_seconds already counts them.
+LOG_LEVELS = os.getenv("LOG_LEVELS", "httpx=WARNING")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Fraction of requests whose DEBUG lines are kept; the rest are dropped
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 1.0))
+# Records waiting for the writer thread; past this they are dropped, not blocked on
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+REQUEST_ID_HEADER = b"x-request-id"
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+log_records_dropped_total = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the log queue was full")
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+
+def mask_phone(phone: Optional[str]) -> str:
+    return f"***{phone[-4:]}" if phone else ""
+
+
+def mask_email(email: Optional[str]) -> str:
+    if not email or "@" not in email:
+        return ""
+    local, domain = email.split("@", 1)
+    return f"{local[:1]}***@{domain}"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request id,
+    the record's `extra` fields and the traceback, if any."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        extra = {k: v for k, v in record.__dict__.items() if k not in _RECORD_ATTRS}
+        line = super().format(record)
+        return f"{line} {json.dumps(extra, default=str)}" if extra else line
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keeps DEBUG records from a `rate` fraction of requests.
+
+    The choice is made per request id, so a sampled request keeps all of
+    its DEBUG lines; records outside a request are sampled one by one.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.threshold = int(rate * 2 ** 32)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.threshold >= 2 ** 32:
+            return True
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            return zlib.crc32(request_id.encode()) < self.threshold
+        return random.getrandbits(32) < self.threshold
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller.
+
+    Only the message is resolved on the calling thread; formatting and the
+    write happen on the listener thread. When the queue is full the
+    record is counted and dropped.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve args now, they may be mutated after the call returns
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_total.inc()
+
+
+_EXC_FORMATTER = logging.Formatter()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def skip_unused_record_fields():
+    # Neither formatter prints process ids or names; skip collecting them per record
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+
+def build_pipeline(stream, fmt: str = LOG_FORMAT, debug_sample_rate: float = LOG_DEBUG_SAMPLE_RATE,
+                   queue_size: int = LOG_QUEUE_SIZE):
+    """The handler loggers write to and the (not yet started) listener
+    that formats its records and writes them to `stream`."""
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    handler = DroppingQueueHandler(queue.Queue(queue_size))
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(DebugSampler(debug_sample_rate))
+    listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    return handler, listener
+
+
+def configure_logging(level: str = LOG_LEVEL, levels: str = LOG_LEVELS, fmt: str = LOG_FORMAT,
+                      debug_sample_rate: float = LOG_DEBUG_SAMPLE_RATE,
+                      queue_size: int = LOG_QUEUE_SIZE, stream=None):
+    """Route the root logger through a bounded queue to a writer thread.
+
+    Idempotent; the listener is flushed and stopped at interpreter exit.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    skip_unused_record_fields()
+    handler, _listener = build_pipeline(stream or sys.stdout, fmt, debug_sample_rate, queue_size)
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    for name, logger_level in _parse_levels(levels).items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write out every queued record and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """Tags each HTTP request with an id for the logs.
+
+    A well-formed X-Request-ID from the client or a proxy is reused,
+    otherwise one is generated. Either way it is echoed in the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or not _VALID_REQUEST_ID.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()),
+                                      (REQUEST_ID_HEADER, request_id.encode())]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,182 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, Tuple
+
+
+# Latency buckets in seconds, wide enough for bcrypt (~0.1-0.5s) and DB calls.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricsRegistry:
+    """Process-wide collection of every metric created in the app."""
+
+    def __init__(self):
+        self._metrics: Dict[str, "Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Metric"):
+        with self._lock:
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def collect(self) -> Iterable["Metric"]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def snapshot(self) -> dict:
+        return {metric.name: metric.snapshot() for metric in self.collect()}
+
+
+REGISTRY = MetricsRegistry()
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: dict) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict = {}
+        REGISTRY.register(self)
+
+    def samples(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def snapshot(self) -> dict:
+        return {
+            ",".join(key) or "_": value
+            for key, value in self.samples()
+        }
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+
+class _HistogramValue:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            hist = self._values.get(key)
+            if hist is None:
+                hist = self._values[key] = _HistogramValue(len(self.buckets))
+            i = bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                hist.counts[i] += 1
+            hist.count += 1
+            hist.sum += value
+
+    def samples(self):
+        with self._lock:
+            return [
+                (key, (list(hist.counts), hist.count, hist.sum))
+                for key, hist in self._values.items()
+            ]
+
+    def snapshot(self) -> dict:
+        result = {}
+        for key, (counts, count, total) in self.samples():
+            cumulative, buckets = 0, {}
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = count
+            result[",".join(key) or "_"] = {
+                "count": count,
+                "sum": round(total, 6),
+                "buckets": buckets,
+            }
+        return result
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def render_prometheus(registry: MetricsRegistry = REGISTRY) -> str:
+    """Every metric in `registry` in the Prometheus text exposition format (0.0.4)."""
+    lines = []
+    for metric in sorted(registry.collect(), key=lambda m: m.name):
+        lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key, value in metric.samples():
+            if isinstance(metric, Histogram):
+                counts, count, total = value
+                cumulative = 0
+                for bound, bucket_count in zip((*metric.buckets, float("inf")), (*counts, 0)):
+                    # Observations above the last bound only show up in +Inf
+                    cumulative = count if bound == float("inf") else cumulative + bucket_count
+                    labels = _format_labels((*metric.labelnames, "le"), (*key, _format_value(bound)))
+                    lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(metric.labelnames, key)
+                lines.append(f"{metric.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{metric.name}_count{labels} {count}")
+            else:
+                lines.append(f"{metric.name}{_format_labels(metric.labelnames, key)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -1,63 +1,84 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta, date
+from schemas import CyclePrediction
+from utils.symptoms import SYMPTOM_SCORES, SYMPTOMS
 
 
-SYMPTOM_SCORES = {
-    "egg_white_mucus": 15,
-    "ovulation_cramps": 10,
-    "high_libido": 8,
-    "soft_cervix": 7,
-    "fatigue": -5,
-    "bloating": -4,
-    "headache": -3,
-    "back_pain": -4
-}
+@dataclass(frozen=True, slots=True)
+class CyclePredictionResult:
+    period_start: date
+    period_end: date
+    period_length: int
+    next_period: date
+    ovulation_day: date
+    fertile_start: date
+    fertile_end: date
+    fertility_score: int
 
+    def to_schema(self) -> CyclePrediction:
+        """Response model; dates only become strings when FastAPI encodes it."""
+        return CyclePrediction(
+            period_start=self.period_start,
+            period_end=self.period_end,
+            period_length=self.period_length,
+            next_period=self.next_period,
+            ovulation_day=self.ovulation_day,
+            fertile_window=[self.fertile_start, self.fertile_end],
+            fertility_score=self.fertility_score
+        )
 
-def simple_fertility_ai(
+    def as_dict(self) -> dict:
+        """The "%Y-%m-%d" string form returned by `simple_fertility_ai`."""
+        return self.to_schema().model_dump(mode="json")
+
+
+def predict_cycle(
     *,
     cycle_length: int,
     last_period_date: date,
     period_length: int,
     symptoms: list[str] | None
-):
+) -> CyclePredictionResult:
     cycle_length = cycle_length or 28
     period_length = period_length or 5 
 
    
-    if isinstance(last_period_date, date):
-        last_period = datetime.combine(last_period_date, datetime.min.time())
+    if isinstance(last_period_date, datetime):
+        last_period = last_period_date.date()
+    elif isinstance(last_period_date, date):
+        last_period = last_period_date
     else:
-        last_period = datetime.strptime(last_period_date, "%Y-%m-%d")
+        last_period = datetime.strptime(last_period_date, "%Y-%m-%d").date()
 
   
-    period_start = last_period
-    period_end = last_period + timedelta(days=period_length - 1)
-
-  
-    next_period = last_period + timedelta(days=cycle_length)
     ovulation = last_period + timedelta(days=cycle_length - 14)
 
-    fertile_window = [
-        (ovulation - timedelta(days=2)).strftime("%Y-%m-%d"),
-        (ovulation + timedelta(days=2)).strftime("%Y-%m-%d")
-    ]
+    fertility_score = 80 + SYMPTOMS.score(SYMPTOMS.encode(symptoms))
+    fertility_score = max(0, min(100, fertility_score))
 
-    fertility_score = 80 
+    return CyclePredictionResult(
+        period_start=last_period,
+        period_end=last_period + timedelta(days=period_length - 1),
+        period_length=period_length,
+        next_period=last_period + timedelta(days=cycle_length),
+        ovulation_day=ovulation,
+        fertile_start=ovulation - timedelta(days=2),
+        fertile_end=ovulation + timedelta(days=2),
+        fertility_score=fertility_score
+    )
 
-    if symptoms:
-        for s in symptoms:
-            if s in SYMPTOM_SCORES:
-                fertility_score += SYMPTOM_SCORES[s]
 
-   
-    fertility_score = max(0, min(100, fertility_score))
-
-    return {
-        "period_start": period_start.strftime("%Y-%m-%d"),
-        "period_end": period_end.strftime("%Y-%m-%d"),
-        "period_length": period_length,
-        "next_period": next_period.strftime("%Y-%m-%d"),
-        "ovulation_day": ovulation.strftime("%Y-%m-%d"),
-        "fertile_window": fertile_window,
-        "fertility_score": fertility_score
-    }
+def simple_fertility_ai(
+    *,
+    cycle_length: int,
+    last_period_date: date,
+    period_length: int,
+    symptoms: list[str] | None
+):
+    """Dict-of-strings form of `predict_cycle`, kept for existing callers."""
+    return predict_cycle(
+        cycle_length=cycle_length,
+        last_period_date=last_period_date,
+        period_length=period_length,
+        symptoms=symptoms
+    ).as_dict()
@@ -0,0 +1,123 @@
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+from utils.enum import Symptom
+
+
+SYMPTOM_SCORES = {
+    "egg_white_mucus": 15,
+    "ovulation_cramps": 10,
+    "high_libido": 8,
+    "soft_cervix": 7,
+    "fatigue": -5,
+    "bloating": -4,
+    "headache": -3,
+    "back_pain": -4
+}
+
+# Bit id of every symptom name, as stored in cycles/insights.symptom_mask.
+# Append only: each entry pairs a name with its position so that reordering,
+# removing or renumbering entries fails the check below instead of silently
+# changing what stored masks decode to.
+SYMPTOM_IDS = (
+    (0, "headache"),
+    (1, "nausea"),
+    (2, "cramps"),
+    (3, "fatigue"),
+    (4, "breast_tenderness"),
+    (5, "acne"),
+    (6, "egg_white_mucus"),
+    (7, "ovulation_cramps"),
+    (8, "high_libido"),
+    (9, "soft_cervix"),
+    (10, "bloating"),
+    (11, "back_pain"),
+)
+
+# Masks are int64 and stored in cycles/insights.symptom_mask
+MAX_SYMPTOMS = 63
+# Registries up to this size score masks from one table of every mask
+_MASK_TABLE_BITS = 16
+
+
+def _bit_matrix(masks: np.ndarray, k: int) -> np.ndarray:
+    return ((np.asarray(masks, dtype=np.int64)[:, None] >> np.arange(k, dtype=np.int64)) & 1).astype(np.int16)
+
+
+class SymptomRegistry:
+    """Interns symptom names to ids 0..n-1 and packs a list of them into a
+    bitmask (bit i set = symptom i present).
+
+    Scores are precomputed with one (masks x symptoms) @ (symptoms,)
+    product, for every possible mask of a small registry or else every
+    byte of one, so scoring an array of masks is one or a few gathers.
+    Ids are persisted, so names may only ever be appended.
+    """
+
+    def __init__(self, names: Iterable[str], scores: Dict[str, int]):
+        self.names = tuple(dict.fromkeys(names))
+        k = len(self.names)
+        if k > MAX_SYMPTOMS:
+            raise ValueError(f"At most {MAX_SYMPTOMS} symptoms fit in a mask")
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.bits = {name: 1 << i for i, name in enumerate(self.names)}
+        self.score_vector = np.array([scores.get(name, 0) for name in self.names], dtype=np.int16)
+
+        if k <= _MASK_TABLE_BITS:
+            self._tables = [_bit_matrix(np.arange(1 << k), k) @ self.score_vector]
+            self._table_bits = k
+        else:
+            padded = np.zeros(-(-k // 8) * 8, dtype=np.int16)
+            padded[:k] = self.score_vector
+            byte_bits = _bit_matrix(np.arange(256), 8)
+            self._tables = [byte_bits @ padded[i:i + 8] for i in range(0, k, 8)]
+            self._table_bits = 8
+        self._scalar_tables = [tuple(table.tolist()) for table in self._tables]
+
+    def encode(self, symptoms: Iterable[str] | None) -> int:
+        """Bitmask of `symptoms`; names not in the registry are dropped."""
+        mask = 0
+        for name in symptoms or ():
+            mask |= self.bits.get(name, 0)
+        return mask
+
+    def encode_many(self, symptom_lists: Sequence[Iterable[str] | None]) -> np.ndarray:
+        return np.fromiter((self.encode(s) for s in symptom_lists), dtype=np.int64,
+                           count=len(symptom_lists))
+
+    def decode(self, mask: int) -> List[str]:
+        return [name for i, name in enumerate(self.names) if mask >> i & 1]
+
+    def score(self, mask: int) -> int:
+        if len(self._scalar_tables) == 1:
+            return self._scalar_tables[0][mask]
+        low = (1 << self._table_bits) - 1
+        return sum(table[mask >> (i * self._table_bits) & low]
+                   for i, table in enumerate(self._scalar_tables))
+
+    def scores(self, masks: np.ndarray) -> np.ndarray:
+        """Summed score of each mask."""
+        masks = np.asarray(masks, dtype=np.int64)
+        if len(self._tables) == 1:
+            return self._tables[0][masks]
+        low = (1 << self._table_bits) - 1
+        total = np.zeros(len(masks), dtype=np.int16)
+        for i, table in enumerate(self._tables):
+            total += table[(masks >> (i * self._table_bits)) & low]
+        return total
+
+
+def _check_symptom_ids():
+    if [i for i, _ in SYMPTOM_IDS] != list(range(len(SYMPTOM_IDS))):
+        raise RuntimeError("SYMPTOM_IDS must list ids 0..n-1 in order; append new symptoms at the end")
+    known = {name for _, name in SYMPTOM_IDS}
+    if len(known) != len(SYMPTOM_IDS):
+        raise RuntimeError("SYMPTOM_IDS lists a symptom twice")
+    missing = [name for name in (*(s.value for s in Symptom), *SYMPTOM_SCORES) if name not in known]
+    if missing:
+        raise RuntimeError(f"Symptoms without a mask bit, append them to SYMPTOM_IDS: {missing}")
+
+
+_check_symptom_ids()
+SYMPTOMS = SymptomRegistry((name for _, name in SYMPTOM_IDS), SYMPTOM_SCORES)
@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta
 
-from schema import Prediction
+from schemas import Prediction
 
 
 def cycle_calculation(start_date: datetime,  period_length: int, cycle_length: int = 28):
@@ -1,14 +1,18 @@
 
+import logging
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
 from fastapi import Depends, HTTPException
+from sqlalchemy import select
 from starlette import status
 from models import Users
-from passlib.context import CryptContext
+from utils.enum import RoleEnum
+from services.password_hasher import bcrypt_context, password_hasher
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from jose import JWTError
+from services.auth_tokens import token_verifier
+from services.email_outbox import queue_email
+from utils.logging_config import mask_email, mask_phone
 import random
 from dotenv import load_dotenv
 import os
@@ -16,23 +20,20 @@ import os
 
 load_dotenv()
 
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl='auth/token')
 OTP_EXPIRE_MINUTES = int(os.getenv("OTP_EXPIRE_MINUTES", 5))
 
-SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
-SENDGRID_SENDER_EMAIL = os.getenv("SENDGRID_SENDER_EMAIL")
-SENDGRID_SENDER_NAME = os.getenv("SENDGRID_SENDER_NAME")
+logger = logging.getLogger(__name__)
 
 
 
 
 
-def authenticate_user(email: str, password: str, db):
-    db_user = db.query(Users).filter(Users.email == email).first()
+async def authenticate_user(email: str, password: str, db):
+    db_user = (await db.scalars(select(Users).where(Users.email == email))).first()
     if not db_user:
         return False
-    if not bcrypt_context.verify(password, db_user.hashed_password):
+    if not await password_hasher.verify(password, db_user.hashed_password):
         return False
     return db_user
 
@@ -41,13 +42,12 @@ def create_access_token(email: str, user_id: int, role: str, expires_delta: time
    encode = {'sub': email, 'id': user_id, 'role': role}
    expires = datetime.now(timezone.utc) + expires_delta
    encode.update({'exp': expires})
-   return jwt.encode(encode, os.getenv('SECRET_KEY'), algorithm=os.getenv('ALGORITHM'))
+   return token_verifier.sign(encode)
 
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
     try:
-        payload = jwt.decode(token, os.getenv('SECRET_KEY'),
-                             algorithms=os.getenv('ALGORITHM'))
+        payload = token_verifier.verify(token)
         email: str = payload.get('sub')
         user_id: int = payload.get('id')
         user_role: str = payload.get('role')
@@ -60,36 +60,36 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
             status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate user!')
 
 
+async def get_current_admin(user: Annotated[dict, Depends(get_current_user)]):
+    if user.get('user_role') != RoleEnum.ADMIN.value:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail='Admin access required')
+    return user
+
+
 #............. otp...............#
 
 def generate_otp(length=4):
    return str(random.randint(10**(length-1), 10**length - 1))
 
 
-def hash_otp(otp: str) -> str:
-    return bcrypt_context.hash(otp)
+async def hash_otp(otp: str) -> str:
+    return await password_hasher.hash(otp)
 
-def verify_otp_hash(plain_otp: str, hashed_otp: str) -> bool:
-    return bcrypt_context.verify(plain_otp, hashed_otp)
+async def verify_otp_hash(plain_otp: str, hashed_otp: str) -> bool:
+    return await password_hasher.verify(plain_otp, hashed_otp)
 
 
 
-#...............implimenting sendgrid emailing service.................#
+#...............queueing emails for the outbox worker.................#
 
-def send_otp_email(to_email: str, otp_code: str):
+def queue_otp_email(db, to_email: str, otp_code: str):
    
-    print(
-        f"[DEBUG] From: {SENDGRID_SENDER_EMAIL}, To: {to_email}, OTP: {otp_code}")
+    logger.debug("Queueing OTP email", extra={"email": mask_email(to_email)})
 
-    if not SENDGRID_API_KEY or not SENDGRID_SENDER_EMAIL or not SENDGRID_SENDER_NAME:
-        raise ValueError("SendGrid environment variables not set correctly.")
-
-    if "@" not in to_email:
-        raise ValueError(f"Invalid recipient email: {to_email}")
-
-    message = Mail(
-        from_email=SENDGRID_SENDER_EMAIL,
-        to_emails=to_email,
+    return queue_email(
+        db,
+        to_email=to_email,
         subject="Your Verification Code",
         html_content=f"""
         <div style="font-family: Arial, sans-serif;">
@@ -101,36 +101,16 @@ def send_otp_email(to_email: str, otp_code: str):
         """
     )
 
-    try:
-        sg = SendGridAPIClient(SENDGRID_API_KEY)
-        response = sg.send(message)
-        print(f"[DEBUG] SendGrid response status: {response.status_code}")
-        if response.status_code not in (200, 202):
-            raise Exception(
-                f"Failed to send email: {response.status_code}, {response.body}")
-        print(f"OTP sent successfully to {to_email}")
-    except Exception as e:
-        print(f"SendGrid error: {e}")
-        raise e
-
 
 
 
-def send_password_reset_email(to_email: str, reset_link: str):
+def queue_password_reset_email(db, to_email: str, reset_link: str):
    
-    print(
-        f"[DEBUG] Sending password reset email to {to_email}, Link: {reset_link}")
-
-    if not SENDGRID_API_KEY or not SENDGRID_SENDER_EMAIL or not SENDGRID_SENDER_NAME:
-        raise ValueError("SendGrid environment variables not set correctly.")
-    if "@" not in to_email:
-        raise ValueError(f"Invalid recipient email: {to_email}")
+    logger.debug("Queueing password reset email", extra={"email": mask_email(to_email)})
 
-   
-   
-    message = Mail(
-        from_email=SENDGRID_SENDER_EMAIL,
-        to_emails=to_email,
+    return queue_email(
+        db,
+        to_email=to_email,
         subject="Reset Your Password",
         html_content=f"""
         <div style="font-family: Arial, sans-serif;">
@@ -143,18 +123,6 @@ def send_password_reset_email(to_email: str, reset_link: str):
         """
     )
 
-    try:
-        sg = SendGridAPIClient(SENDGRID_API_KEY)
-        response = sg.send(message)
-        print(f"[DEBUG] SendGrid response status: {response.status_code}")
-        if response.status_code not in (200, 202):
-            raise Exception(
-                f"Failed to send password reset email: {response.status_code}, {response.body}")
-        print(f"Password reset email sent successfully to {to_email}")
-    except Exception as e:
-        print(f"SendGrid error: {e}")
-        raise e
-
 
 
 
@@ -162,7 +130,8 @@ def send_password_reset_email(to_email: str, reset_link: str):
 # implimenting sendgrid emailing service
 
 def send_otp_sms(phone_number: str, message: str):
-    # For testing, just print
-    print(f"Sending SMS to {phone_number}: {message}")
+    # No SMS provider yet. The message holds the OTP, so it is not logged.
+    logger.info("SMS not sent, no provider configured",
+                extra={"phone": mask_phone(phone_number), "chars": len(message)})
 
 